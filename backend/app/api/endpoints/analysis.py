@@ -1,11 +1,19 @@
-from fastapi import APIRouter
-from ...services.ai_score import get_health_score, generate_cfo_response
+from fastapi import APIRouter, Depends, File, HTTPException, UploadFile
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Session
+from ...core.database import get_db
+from ...services.ai_score import get_health_score
+from ...services import chat, fact_index, credit, business, gst_reconciliation, anomaly
+from ...services.pagination import DEFAULT_PAGE_SIZE
+from ...core.encoding import FastJSONResponse
 from pydantic import BaseModel
+from typing import Optional
 import random
 from datetime import datetime, timedelta
 
 class ChatRequest(BaseModel):
     message: str
+    business_id: Optional[int] = None
     context: dict = {}
 
 router = APIRouter()
@@ -15,10 +23,25 @@ async def health_score(language: str = "en"):
     # Integrated AI Health Score
     return await get_health_score({})
 
+def _chat_facts(request: ChatRequest, db: Session):
+    if request.business_id is None:
+        return None
+    return fact_index.get_facts(db, request.business_id)
+
 @router.post("/chat")
-async def chat_cfo(request: ChatRequest):
-    response = await generate_cfo_response(request.message, request.context)
-    return {"response": response}
+def chat_cfo(request: ChatRequest, db: Session = Depends(get_db)):
+    facts = _chat_facts(request, db)
+    return {"response": chat.answer(request.message, request.business_id, facts)}
+
+@router.post("/chat/stream")
+def chat_cfo_stream(request: ChatRequest, db: Session = Depends(get_db)):
+    # Server-Sent Events: one `data:` frame per chunk, then an `event: done` frame
+    facts = _chat_facts(request, db)
+    return StreamingResponse(
+        chat.sse_events(request.message, request.business_id, facts),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 @router.get("/cashflow-patterns")
 async def cashflow():
@@ -42,27 +65,54 @@ async def cashflow():
     }
 
 @router.get("/compliance")
-async def compliance():
+def compliance(business_id: int, db: Session = Depends(get_db)):
     # 1.4 Tax Compliance & GST Risk Analyzer
-    return {
-        "risk_level": "Low",
-        "gst_status": "Filed",
-        "last_filing_date": "2023-09-20",
-        "flags": [], # No mismatches
-        "details": "All ITC claims match vendor filings. No notices detected."
-    }
+    biz = business.get_business_context(db, business_id)
+    if not biz:
+        raise HTTPException(status_code=404, detail="Business not found")
+    return gst_reconciliation.compliance_overview(db, business_id, biz.gst_number)
+
+@router.post("/compliance/gst-returns")
+def upload_gst_return(
+    business_id: int,
+    period: str,
+    return_type: str = "GSTR-2B",
+    file: UploadFile = File(...),
+    db: Session = Depends(get_db)
+):
+    # Each filing is reconciled on arrival; re-uploading a period replaces it
+    if not business.business_exists(db, business_id):
+        raise HTTPException(status_code=404, detail="Business not found")
+    return gst_reconciliation.reconcile_filing(db, business_id, return_type, file.file, file.filename, period)
 
 @router.get("/credit-eligibility")
-async def credit_eligibility():
+def credit_eligibility(business_id: int, db: Session = Depends(get_db)):
     # 1.2 Intelligent Creditworthiness & Loan Eligibility Engine
-    return {
-        "eligible": True,
-        "max_loan_amount": 1500000,
-        "recommended_products": [
-            {"type": "Invoice Discounting", "match_score": 95, "reason": "Consistent receivables pattern matches discounting criteria."},
-            {"type": "Working Capital Term Loan", "match_score": 82, "reason": "Healthy debt-service coverage ratio (1.8)."}
-        ]
-    }
+    if not business.business_exists(db, business_id):
+        raise HTTPException(status_code=404, detail="Business not found")
+    return credit.assess_business(db, business_id)
+
+@router.get("/credit-eligibility/portfolio")
+def credit_portfolio(top_n: int = 3, db: Session = Depends(get_db)):
+    # Re-rank every business against the current partner catalog
+    try:
+        return {"businesses": credit.rank_portfolio(db, top_n)}
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.get("/anomalies")
+def anomalies(
+    business_id: int,
+    kind: Optional[str] = None,
+    limit: int = DEFAULT_PAGE_SIZE,
+    cursor: Optional[str] = None,
+    db: Session = Depends(get_db)
+):
+    # Outliers and duplicate charges flagged at ingest, newest first
+    try:
+        return FastJSONResponse(anomaly.list_anomalies(db, business_id, limit, cursor, kind))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
 @router.get("/forecast")
 async def forecast():
@@ -1,7 +1,11 @@
+from datetime import datetime
 from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
-from ...core.database import get_db
-from ...services import business
+from ...core.database import get_db, SessionLocal
+from ...core.encoding import FastJSONResponse
+from ...services import business, transactions
+from ...services.pagination import DEFAULT_PAGE_SIZE
 from pydantic import BaseModel
 
 router = APIRouter()
@@ -11,6 +15,22 @@ class BusinessCreate(BaseModel):
     industry: str
     gst_number: str = None
 
+def _ndjson(stream_fn, *args, **kwargs):
+    # Streams outlive the request-scoped session, so they get their own
+    db = SessionLocal()
+    try:
+        rows = stream_fn(db, *args, **kwargs)
+    except ValueError as e:
+        db.close()
+        raise HTTPException(status_code=400, detail=str(e))
+
+    def body():
+        try:
+            yield from rows
+        finally:
+            db.close()
+    return StreamingResponse(body(), media_type="application/x-ndjson")
+
 @router.post("/")
 def create_business(data: BusinessCreate, db: Session = Depends(get_db)):
     try:
@@ -21,8 +41,18 @@ def create_business(data: BusinessCreate, db: Session = Depends(get_db)):
         raise HTTPException(status_code=400, detail=str(e))
 
 @router.get("/")
-def list_businesses(db: Session = Depends(get_db)):
-    return business.list_businesses(db)
+def list_businesses(
+    limit: int = DEFAULT_PAGE_SIZE,
+    cursor: str = None,
+    format: str = "json",
+    db: Session = Depends(get_db)
+):
+    if format == "ndjson":
+        return _ndjson(business.stream_businesses, cursor)
+    try:
+        return FastJSONResponse(business.list_businesses(db, limit, cursor))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
 @router.get("/{business_id}")
 def get_business(business_id: int, db: Session = Depends(get_db)):
@@ -30,3 +60,23 @@ def get_business(business_id: int, db: Session = Depends(get_db)):
     if not biz:
         raise HTTPException(status_code=404, detail="Business not found")
     return biz
+
+@router.get("/{business_id}/transactions")
+def list_transactions(
+    business_id: int,
+    limit: int = DEFAULT_PAGE_SIZE,
+    cursor: str = None,
+    type: str = None,
+    category: str = None,
+    start: datetime = None,
+    end: datetime = None,
+    format: str = "json",
+    db: Session = Depends(get_db)
+):
+    filters = {"transaction_type": type, "category": category, "start": start, "end": end}
+    if format == "ndjson":
+        return _ndjson(transactions.stream_transactions, business_id, cursor, **filters)
+    try:
+        return FastJSONResponse(transactions.list_transactions(db, business_id, limit, cursor, **filters))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
@@ -1,13 +1,13 @@
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 from ...core.database import get_db
-from ...services import analytics, advisor, business
+from ...services import analytics, advisor, business, benchmarks
 from ...models.financial import Transaction
 
 router = APIRouter()
 
 @router.get("/{business_id}")
-async def get_comprehensive_analysis(business_id: int, db: Session = Depends(get_db)):
+async def get_comprehensive_analysis(business_id: int, lang: str = "en", db: Session = Depends(get_db)):
     biz = business.get_business_context(db, business_id)
     if not biz:
         raise HTTPException(status_code=404, detail="Business not found")
@@ -27,9 +27,11 @@ async def get_comprehensive_analysis(business_id: int, db: Session = Depends(get
         })
     
     # If no transactions, use an empty list (analytics handles empty df)
-    analysis = analytics.calculate_industry_ratios(txns, biz.industry)
-    narrative_en = advisor.generate_financial_narrative(analysis, biz.industry, "en")
-    narrative_hi = advisor.generate_financial_narrative(analysis, biz.industry, "hi")
+    analysis = analytics.calculate_industry_ratios(txns, biz.industry, benchmarks.get_peer_targets(db, biz.industry))
+    analysis["peer_percentiles"] = benchmarks.get_peer_percentiles(db, biz.industry, analysis["metrics"])
+    # Only render the requested languages, e.g. ?lang=en or ?lang=en,hi
+    languages = [l.strip() for l in lang.split(",") if l.strip() in advisor.SUPPORTED_LANGUAGES]
+    narratives = advisor.generate_narratives(analysis, biz.industry, languages or [advisor.DEFAULT_LANGUAGE])
     recommendations = advisor.recommend_financial_products(analysis, biz.industry)
     
     # Generate charts data (Dynamic)
@@ -39,10 +41,7 @@ async def get_comprehensive_analysis(business_id: int, db: Session = Depends(get
         "business": biz.name,
         "industry": biz.industry,
         "analysis": analysis,
-        "narratives": {
-            "en": narrative_en,
-            "hi": narrative_hi
-        },
+        "narratives": narratives,
         "recommendations": recommendations,
         "credit_score": analysis["overall_score"],
         "timeseries": timeseries,
@@ -2,6 +2,7 @@ from fastapi import APIRouter, UploadFile, File, Depends, HTTPException
 from sqlalchemy.orm import Session
 from ...core.database import get_db
 from ...services.ingestion import process_file
+from ...services import fact_index, benchmarks, anomaly
 from ...models.financial import Transaction
 
 router = APIRouter()
@@ -33,18 +34,43 @@ async def upload_financial_document(
     # 2. Save to DB
     saved_count = 0
     try:
+        db_transactions = []
         for t_data in transactions_data:
             db_transaction = Transaction(**t_data, business_id=b_id)
             db.add(db_transaction)
+            db_transactions.append(db_transaction)
             saved_count += 1
         
+        db.flush()
+        new_rows = [{**t_data, "id": t.id} for t_data, t in zip(transactions_data, db_transactions)]
         db.commit()
     except Exception as e:
         db.rollback()
         raise HTTPException(status_code=500, detail=f"Database Error: {str(e)}")
     
+    # 2b. Flag outliers and duplicates; a failure here never loses the upload
+    try:
+        anomalies = anomaly.detect_anomalies(db, b_id, new_rows)
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        print(f"Anomaly detection failed for business {b_id}: {e}")
+        anomalies = None
+    
+    # 3. Refresh the fact index used by the CFO chat, then snapshot the new
+    # metrics for the industry peer sketches. The upload is already saved, so
+    # a failure is logged rather than returned as an error the client retries
+    try:
+        facts = fact_index.rebuild_facts(db, b_id)
+        if facts:
+            benchmarks.record_snapshot(db, b_id, facts["industry"], facts)
+    except Exception as e:
+        db.rollback()
+        print(f"Post-upload refresh failed for business {b_id}: {e}")
+    
     return {
         "message": "File processed successfully", 
         "transactions_count": saved_count,
+        "anomalies": anomalies,
         "sample": transactions_data[:3]
     }
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, Enum, Boolean
+from sqlalchemy import Column, Integer, String, Float, DateTime, Enum, Boolean, LargeBinary, UniqueConstraint, Index
 from ..core.database import Base
 import enum
 from datetime import datetime
@@ -53,6 +53,8 @@ class HealthSnapshot(Base):
 
 class Transaction(Base):
     __tablename__ = "transactions"
+    # Keyset pagination walks (business_id, date, id)
+    __table_args__ = (Index("ix_transactions_business_date_id", "business_id", "date", "id"),)
 
     id = Column(Integer, primary_key=True, index=True)
     business_id = Column(Integer, index=True, nullable=True)
@@ -65,3 +67,97 @@ class Transaction(Base):
     # Metadata for audit trail
     source_file = Column(String, nullable=True)
     ingested_at = Column(DateTime, default=datetime.utcnow)
+
+class BusinessFacts(Base):
+    __tablename__ = "business_facts"
+
+    id = Column(Integer, primary_key=True, index=True)
+    business_id = Column(Integer, unique=True, index=True)
+    facts = Column(String)  # JSON fact index used by the CFO chat
+    version = Column(Integer, default=1)
+    updated_at = Column(DateTime, default=datetime.utcnow)
+
+class IndustrySketch(Base):
+    __tablename__ = "industry_sketches"
+    __table_args__ = (UniqueConstraint("industry", "metric"),)
+
+    id = Column(Integer, primary_key=True, index=True)
+    industry = Column(String, index=True)
+    metric = Column(String)  # current_ratio / net_margin / scale
+    sketch = Column(LargeBinary)  # Serialized KLLSketch
+    count = Column(Integer, default=0)
+    updated_at = Column(DateTime, default=datetime.utcnow)
+
+class PeerSample(Base):
+    __tablename__ = "peer_samples"
+    # One row per business per month, overwritten by each snapshot until the month closes
+    __table_args__ = (UniqueConstraint("business_id", "period"),)
+
+    id = Column(Integer, primary_key=True, index=True)
+    business_id = Column(Integer, index=True)
+    industry = Column(String)
+    period = Column(String)  # "2025-01"
+    current_ratio = Column(Float, nullable=True)
+    net_margin = Column(Float, nullable=True)
+    scale = Column(Float, nullable=True)
+    sketched = Column(Boolean, default=False, index=True)  # Folded into industry_sketches
+    updated_at = Column(DateTime, default=datetime.utcnow)
+
+class GstFiling(Base):
+    __tablename__ = "gst_filings"
+
+    id = Column(Integer, primary_key=True, index=True)
+    business_id = Column(Integer, index=True)
+    return_type = Column(String)  # GSTR-1 (outward) / GSTR-2A / GSTR-2B (inward)
+    period = Column(String, nullable=True)  # Return period, e.g. "2025-01"; required for new uploads
+    source_file = Column(String, nullable=True)
+    line_count = Column(Integer, default=0)
+    status = Column(String, default="Pending")
+    created_at = Column(DateTime, default=datetime.utcnow)
+    reconciled_at = Column(DateTime, nullable=True)
+
+class GstReturnLine(Base):
+    __tablename__ = "gst_return_lines"
+
+    id = Column(Integer, primary_key=True, index=True)
+    filing_id = Column(Integer, index=True)
+    business_id = Column(Integer, index=True)
+    counterparty_gstin = Column(String, nullable=True)
+    invoice_number = Column(String)
+    invoice_key = Column(String, index=True)  # Normalized invoice_number used for matching
+    invoice_date = Column(DateTime, nullable=True)  # None when the return's date could not be parsed
+    invoice_value = Column(Float)
+    tax_amount = Column(Float, default=0.0)  # IGST + CGST + SGST + cess, i.e. ITC claimed
+    match_status = Column(String, index=True)
+    matched_transaction_id = Column(Integer, nullable=True, index=True)
+
+class CategoryStats(Base):
+    __tablename__ = "category_stats"
+    __table_args__ = (UniqueConstraint("business_id", "category", "transaction_type"),)
+
+    id = Column(Integer, primary_key=True, index=True)
+    business_id = Column(Integer, index=True)
+    category = Column(String)
+    transaction_type = Column(String)
+
+    # Welford running mean / sum of squared deviations
+    count = Column(Integer, default=0)
+    mean = Column(Float, default=0.0)
+    m2 = Column(Float, default=0.0)
+
+    # Exponentially weighted mean / variance of recent amounts
+    ewma = Column(Float, nullable=True)
+    ewm_var = Column(Float, default=0.0)
+    updated_at = Column(DateTime, default=datetime.utcnow)
+
+class TransactionAnomaly(Base):
+    __tablename__ = "transaction_anomalies"
+
+    id = Column(Integer, primary_key=True, index=True)
+    business_id = Column(Integer, index=True)
+    transaction_id = Column(Integer, index=True)
+    kind = Column(String)  # outlier / duplicate
+    score = Column(Float, nullable=True)  # |z| for outliers
+    expected_amount = Column(Float, nullable=True)
+    duplicate_of = Column(Integer, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
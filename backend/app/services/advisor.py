@@ -1,56 +1,157 @@
-from typing import Dict, List
+import json
+from functools import lru_cache
+from pathlib import Path
+from string import Formatter
+from typing import Dict, List, Sequence, Tuple
+
+import numpy as np
+
 from ..models.financial import IndustryType
 
+DATA_DIR = Path(__file__).resolve().parent.parent / "data"
+NARRATIVES_DIR = DATA_DIR / "narratives"
+RECOMMENDATION_RULES_FILE = DATA_DIR / "recommendation_rules.json"
+
+DEFAULT_LANGUAGE = "en"
+SCORE_BUCKET_SIZE = 10
+
+# A compiled template is a tuple of (literal, field_name) pairs, as produced by
+# string.Formatter().parse. field_name is None for a trailing literal.
+CompiledTemplate = Tuple[Tuple[str, str], ...]
+
+
+def _compile(template: str) -> CompiledTemplate:
+    return tuple((literal, field) for literal, field, _, _ in Formatter().parse(template))
+
+
+def _compile_status(entry) -> Tuple[Tuple[int, CompiledTemplate], ...]:
+    # A status maps either to one template or to {min_score: template} bands
+    if isinstance(entry, str):
+        return ((0, _compile(entry)),)
+    bands = sorted((int(low), _compile(text)) for low, text in entry.items())
+    return tuple(bands)
+
+
+def load_narrative_templates(directory: Path = NARRATIVES_DIR) -> Dict[str, Dict]:
+    """
+    Loads and compiles every <language>.json file in the narratives directory.
+    """
+    catalog = {}
+    for path in sorted(directory.glob("*.json")):
+        with open(path, encoding="utf-8") as f:
+            raw = json.load(f)
+        catalog[path.stem] = {
+            "default": _compile(raw["default"]),
+            "statuses": {status: _compile_status(entry) for status, entry in raw.get("statuses", {}).items()},
+        }
+    return catalog
+
+
+def load_recommendation_rules(path: Path = RECOMMENDATION_RULES_FILE) -> Dict:
+    """
+    Loads the product rule table and splits it into NumPy bound columns.
+    min_score is exclusive and max_score inclusive; null means unbounded.
+    """
+    with open(path, encoding="utf-8") as f:
+        rules = json.load(f)
+    return {
+        "products": [
+            {k: rule[k] for k in ("product", "provider", "est_rate", "reason")} for rule in rules
+        ],
+        "min_score": np.array([r["min_score"] if r.get("min_score") is not None else -np.inf for r in rules], dtype=float),
+        "max_score": np.array([r["max_score"] if r.get("max_score") is not None else np.inf for r in rules], dtype=float),
+        "industries": [set(r["industries"]) if r.get("industries") else None for r in rules],
+    }
+
+
+# Loaded once at import so request handlers never touch the filesystem
+NARRATIVE_TEMPLATES = load_narrative_templates()
+RECOMMENDATION_RULES = load_recommendation_rules()
+SUPPORTED_LANGUAGES = tuple(NARRATIVE_TEMPLATES)
+
+
+def score_bucket(score: float) -> int:
+    return int(max(0, min(score, 100)) // SCORE_BUCKET_SIZE)
+
+
+@lru_cache(maxsize=4096)
+def _bind_template(status: str, bucket: int, industry: str, language: str) -> CompiledTemplate:
+    """
+    Selects the template for (status, score bucket, language) and binds the
+    fields that are fixed for the key, leaving only score/target to fill in.
+    """
+    catalog = NARRATIVE_TEMPLATES.get(language) or NARRATIVE_TEMPLATES[DEFAULT_LANGUAGE]
+    bands = catalog["statuses"].get(status)
+    compiled = catalog["default"]
+    if bands:
+        for low, candidate in bands:
+            if bucket * SCORE_BUCKET_SIZE >= low:
+                compiled = candidate
+
+    fixed = {"industry": industry, "status": status}
+    bound = []
+    pending = ""
+    for literal, field in compiled:
+        pending += literal
+        if field in fixed:
+            pending += str(fixed[field])
+        elif field is not None:
+            bound.append((pending, field))
+            pending = ""
+    bound.append((pending, None))
+    return tuple(bound)
+
+
 def generate_financial_narrative(metrics: Dict, industry: str, language: str = "en") -> str:
     """
-    Generates a professional financial narrative. 
+    Generates a professional financial narrative from the localized templates.
     In production, this would call GPT-5/Claude with a prompt.
     """
     score = metrics.get("overall_score", 0)
     status = metrics.get("metrics", {}).get("status", "Unknown")
-    
-    if language == "hi":
-        # Placeholder for Hindi translation layer
-        return f"आपके व्यवसाय का वित्तीय स्वास्थ्य {score}/100 है। आपकी स्थिति: {status}।"
-
-    templates = {
-        "Healthy": "Your business demonstrates robust financial discipline with a credit score of {score}. Liquidity is optimized for the {industry} sector.",
-        "At Risk": "Financial indicators suggest caution. While revenue is present, your current ratio is trailing the {industry} sector median of {target}.",
-        "No Data": "Your financial analysis is ready to begin. Please upload your transaction history to generate your health index.",
-    }
-    
     target = metrics.get("metrics", {}).get("target_benchmark", 1.5)
-    template = templates.get(status, "Please upload your financial documents to generate your first assessment.")
-    
-    return template.format(score=score, industry=industry, target=target)
+
+    values = {"score": score, "target": target}
+    parts = []
+    for literal, field in _bind_template(status, score_bucket(score), industry, language):
+        parts.append(literal)
+        if field is not None:
+            parts.append(str(values.get(field, "")))
+    return "".join(parts)
+
+
+def generate_narratives(metrics: Dict, industry: str, languages: Sequence[str]) -> Dict[str, str]:
+    """
+    Renders the narrative only for the requested languages.
+    """
+    return {lang: generate_financial_narrative(metrics, industry, lang) for lang in languages}
+
+
+def recommend_financial_products_batch(scores: Sequence[float], industries: Sequence[str]) -> List[List[Dict]]:
+    """
+    Evaluates the rule table for many businesses in one pass.
+    Each business gets the first rule whose score band and industry match.
+    """
+    scores = np.asarray(scores, dtype=float)
+    if scores.size == 0:
+        return []
+
+    rules = RECOMMENDATION_RULES
+    # (businesses x rules) match matrix
+    matches = (scores[:, None] > rules["min_score"][None, :]) & (scores[:, None] <= rules["max_score"][None, :])
+    for j, allowed in enumerate(rules["industries"]):
+        if allowed is not None:
+            matches[:, j] &= np.array([ind in allowed for ind in industries], dtype=bool)
+
+    has_match = matches.any(axis=1)
+    first = matches.argmax(axis=1)
+    products = rules["products"]
+    return [[dict(products[j])] if ok else [] for j, ok in zip(first, has_match)]
+
 
 def recommend_financial_products(metrics: Dict, industry: str) -> List[Dict]:
     """
     AI-driven product recommendations from banks and NBFCs.
     """
     score = metrics.get("overall_score", 0)
-    recommendations = []
-    
-    if score > 80:
-        recommendations.append({
-            "product": "Unsecured Business Expansion Loan",
-            "provider": "Tier-1 Bank",
-            "est_rate": "8.5% - 10%",
-            "reason": "High creditworthiness"
-        })
-    elif score > 60:
-        recommendations.append({
-            "product": "Working Capital Overdraft",
-            "provider": "SME-Focused NBFC",
-            "est_rate": "11% - 13%",
-            "reason": "Standard liquidity support"
-        })
-    else:
-        recommendations.append({
-            "product": "Invoice Factoring",
-            "provider": "Fintech Partner",
-            "est_rate": "Variable",
-            "reason": "Immediate cashflow required"
-        })
-        
-    return recommendations
+    return recommend_financial_products_batch([score], [industry])[0]
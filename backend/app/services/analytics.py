@@ -1,8 +1,19 @@
-from typing import List, Dict
+from typing import List, Dict, Optional
 import pandas as pd
 from ..models.financial import IndustryType
 
-def calculate_industry_ratios(transactions: List[dict], industry: str) -> Dict:
+# Reference values for "Good" current ratios by industry, used until the
+# industry has enough peers for live benchmarks (see services/benchmarks.py)
+DEFAULT_BENCHMARKS = {
+    IndustryType.MANUFACTURING.value: {"current_ratio": 1.5, "net_margin": 0.10},
+    IndustryType.RETAIL.value: {"current_ratio": 1.2, "net_margin": 0.05},
+    IndustryType.SERVICES.value: {"current_ratio": 2.0, "net_margin": 0.15},
+    IndustryType.ECOMMERCE.value: {"current_ratio": 1.3, "net_margin": 0.08},
+    IndustryType.LOGISTICS.value: {"current_ratio": 1.4, "net_margin": 0.07},
+    IndustryType.AGRICULTURE.value: {"current_ratio": 1.1, "net_margin": 0.12},
+}
+
+def calculate_industry_ratios(transactions: List[dict], industry: str, peer_targets: Optional[Dict] = None) -> Dict:
     df = pd.DataFrame(transactions)
     if df.empty:
         return {
@@ -11,8 +22,10 @@ def calculate_industry_ratios(transactions: List[dict], industry: str) -> Dict:
                 "current_ratio": 0,
                 "net_margin": 0,
                 "target_benchmark": 0,
+                "total_income": 0,
                 "status": "No Data"
             },
+            "score_drivers": {"liquidity": 0, "profitability": 0, "scale": 0},
             "industry_insights": ["Please upload financial data to begin analysis."]
         }
     
@@ -25,19 +38,11 @@ def calculate_industry_ratios(transactions: List[dict], industry: str) -> Dict:
     cash_out = total_expense
     current_ratio = cash_in / cash_out if cash_out > 0 else cash_in
     
-    # Industry Specific Benchmarking
-    # Reference values for "Good" current ratios by industry
-    benchmarks = {
-        IndustryType.MANUFACTURING.value: {"current_ratio": 1.5, "net_margin": 0.10},
-        IndustryType.RETAIL.value: {"current_ratio": 1.2, "net_margin": 0.05},
-        IndustryType.SERVICES.value: {"current_ratio": 2.0, "net_margin": 0.15},
-        IndustryType.ECOMMERCE.value: {"current_ratio": 1.3, "net_margin": 0.08},
-        IndustryType.LOGISTICS.value: {"current_ratio": 1.4, "net_margin": 0.07},
-        IndustryType.AGRICULTURE.value: {"current_ratio": 1.1, "net_margin": 0.12},
-    }
-    
-    config = benchmarks.get(industry, benchmarks[IndustryType.SERVICES.value])
-    target_ratio = config["current_ratio"]
+    # Peer medians when the industry has enough snapshots, static reference otherwise
+    config = dict(DEFAULT_BENCHMARKS.get(industry, DEFAULT_BENCHMARKS[IndustryType.SERVICES.value]))
+    if peer_targets:
+        config.update({k: v for k, v in peer_targets.items() if v is not None and v > 0})
+    target_ratio = round(config["current_ratio"], 2)
     target_margin = config["net_margin"]
     
     current_margin = (total_income - total_expense) / total_income if total_income > 0 else 0
@@ -56,7 +61,7 @@ def calculate_industry_ratios(transactions: List[dict], industry: str) -> Dict:
     if current_ratio < target_ratio:
         insights.append(f"Your liquidity is below the {industry} industry benchmark ({target_ratio}).")
     if current_margin < target_margin:
-        insights.append(f"Operating margins are underperforming against peers. Target: {target_margin*100}%.")
+        insights.append(f"Operating margins are underperforming against peers. Target: {round(target_margin*100, 2)}%.")
 
     return {
         "overall_score": credit_score,
@@ -64,8 +69,14 @@ def calculate_industry_ratios(transactions: List[dict], industry: str) -> Dict:
             "current_ratio": round(current_ratio, 2),
             "net_margin": round(current_margin, 4),
             "target_benchmark": target_ratio,
+            "total_income": round(float(total_income), 2),
             "status": bench_status
         },
+        "score_drivers": {
+            "liquidity": round(liquidity_score, 1),
+            "profitability": round(profit_score, 1),
+            "scale": round(scale_score, 1)
+        },
         "industry_insights": insights
     }
 
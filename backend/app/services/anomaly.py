@@ -0,0 +1,221 @@
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+from sqlalchemy.orm import Session
+
+from ..models.financial import CategoryStats, Transaction, TransactionAnomaly
+from .pagination import clamp_limit, decode_cursor, encode_cursor
+
+# Categories need this much history before amounts are scored
+MIN_HISTORY = 5
+Z_THRESHOLD = 3.0
+EWMA_ALPHA = 0.1
+
+# Floor on the deviation, relative to the mean, so perfectly regular
+# payments (identical rent every month) don't flag on tiny changes
+MIN_RELATIVE_STD = 0.05
+
+# Same amount and description within this many days counts as a duplicate
+DUPLICATE_WINDOW_DAYS = 2
+
+# Bound on IN (...) list sizes when looking up historical amounts
+LOOKUP_CHUNK = 500
+
+OUTLIER = "outlier"
+DUPLICATE = "duplicate"
+
+
+def _charge_keys(df: pd.DataFrame) -> pd.Series:
+    desc = df["description"].astype(str).str.lower().str.replace(r"[^a-z0-9]+", " ", regex=True).str.strip()
+    cents = np.rint(df["amount"].astype(float) * 100).astype("int64").astype(str)
+    return pd.util.hash_pandas_object(cents + "|" + df["transaction_type"].astype(str) + "|" + desc, index=False)
+
+
+def _load_stats(db: Session, business_id: int, categories: List[str]) -> Dict[tuple, CategoryStats]:
+    rows = db.query(CategoryStats).filter(
+        CategoryStats.business_id == business_id,
+        CategoryStats.category.in_(categories),
+    ).all()
+    return {(r.category, r.transaction_type): r for r in rows}
+
+
+def _score_outliers(batch: pd.DataFrame, stats: Dict[tuple, CategoryStats]) -> pd.DataFrame:
+    """
+    Scores every row against its category's statistics as they stood before this batch.
+    A row is an outlier only if it deviates from both the long-run (Welford) and
+    the recent (EWMA) level, so a sustained level shift stops flagging quickly.
+    """
+    keys = list(zip(batch["category"], batch["transaction_type"]))
+    count = np.array([stats[k].count if k in stats else 0 for k in keys], dtype=float)
+    mean = np.array([stats[k].mean if k in stats else np.nan for k in keys], dtype=float)
+    m2 = np.array([stats[k].m2 if k in stats else np.nan for k in keys], dtype=float)
+    ewma = np.array([stats[k].ewma if k in stats and stats[k].ewma is not None else np.nan for k in keys], dtype=float)
+    ewm_var = np.array([stats[k].ewm_var if k in stats else np.nan for k in keys], dtype=float)
+
+    amount = batch["amount"].to_numpy(dtype=float)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        std_long = np.maximum(np.sqrt(m2 / (count - 1)), MIN_RELATIVE_STD * np.abs(mean))
+        std_recent = np.maximum(np.sqrt(ewm_var), MIN_RELATIVE_STD * np.abs(ewma))
+        z_long = np.abs(amount - mean) / std_long
+        z_recent = np.abs(amount - ewma) / std_recent
+    score = np.fmin(z_long, z_recent)
+
+    flagged = (count >= MIN_HISTORY) & np.isfinite(score) & (score >= Z_THRESHOLD)
+    out = batch.loc[flagged, ["id"]].copy()
+    out["score"] = np.round(score[flagged], 2)
+    out["expected_amount"] = np.round(mean[flagged], 2)
+    return out
+
+
+def _find_duplicates(db: Session, business_id: int, batch: pd.DataFrame) -> pd.DataFrame:
+    """
+    Hashes (amount, type, description) and looks for the same key within
+    DUPLICATE_WINDOW_DAYS, first inside the batch, then among earlier rows in
+    the batch's date window only.
+    """
+    window = pd.Timedelta(days=DUPLICATE_WINDOW_DAYS)
+    batch = batch.assign(key=_charge_keys(batch)).sort_values(["key", "date", "id"])
+
+    # Inside the batch: compare each row with the previous row of the same key
+    same_key = batch["key"].eq(batch["key"].shift())
+    close = (batch["date"] - batch["date"].shift()) <= window
+    inside = batch.loc[same_key & close, ["id"]].assign(duplicate_of=batch["id"].shift()[same_key & close])
+
+    # Against history: only rows with a matching amount near the batch's dates
+    start = (batch["date"].min() - window).to_pydatetime()
+    end = (batch["date"].max() + window).to_pydatetime()
+    amounts = batch["amount"].unique().tolist()
+    history = []
+    for i in range(0, len(amounts), LOOKUP_CHUNK):
+        history += db.query(
+            Transaction.id, Transaction.date, Transaction.amount,
+            Transaction.transaction_type, Transaction.description,
+        ).filter(
+            Transaction.business_id == business_id,
+            Transaction.id < int(batch["id"].min()),
+            Transaction.date >= start,
+            Transaction.date <= end,
+            Transaction.amount.in_(amounts[i:i + LOOKUP_CHUNK]),
+        ).all()
+
+    earlier = pd.DataFrame(columns=["id", "duplicate_of"])
+    if history:
+        hist = pd.DataFrame([h._asdict() for h in history])
+        hist["date"] = pd.to_datetime(hist["date"])
+        hist = hist.assign(key=_charge_keys(hist)).rename(columns={"id": "duplicate_of", "date": "hist_date"})
+        matched = pd.merge_asof(
+            batch[["id", "date", "key"]].sort_values("date"),
+            hist[["duplicate_of", "hist_date", "key"]].sort_values("hist_date"),
+            left_on="date", right_on="hist_date", by="key", direction="nearest", tolerance=window,
+        ).dropna(subset=["duplicate_of"])
+        earlier = matched[["id", "duplicate_of"]]
+
+    dups = pd.concat([earlier, inside]).drop_duplicates("id")
+    dups["duplicate_of"] = dups["duplicate_of"].astype("int64")
+    return dups
+
+
+def _update_stats(db: Session, business_id: int, batch: pd.DataFrame, stats: Dict[tuple, CategoryStats]):
+    """
+    Folds the batch into the running statistics: Chan's parallel Welford merge
+    for mean/variance, and the EWMA recurrences in date order.
+    """
+    now = datetime.utcnow()
+    for (category, t_type), group in batch.sort_values(["date", "id"]).groupby(["category", "transaction_type"]):
+        values = group["amount"].to_numpy(dtype=float)
+        row = stats.get((category, t_type))
+        if row is None:
+            row = CategoryStats(business_id=business_id, category=category, transaction_type=t_type,
+                                count=0, mean=0.0, m2=0.0, ewma=None, ewm_var=0.0)
+            db.add(row)
+
+        n_b = len(values)
+        mean_b = values.mean()
+        m2_b = ((values - mean_b) ** 2).sum()
+        n = row.count + n_b
+        delta = mean_b - row.mean
+        row.m2 = row.m2 + m2_b + delta ** 2 * row.count * n_b / n
+        row.mean = row.mean + delta * n_b / n
+        row.count = n
+
+        ewma = row.ewma if row.ewma is not None else values[0]
+        ewm_var = row.ewm_var or 0.0
+        for x in values:
+            diff = x - ewma
+            ewma += EWMA_ALPHA * diff
+            ewm_var = (1 - EWMA_ALPHA) * (ewm_var + EWMA_ALPHA * diff * diff)
+        row.ewma = float(ewma)
+        row.ewm_var = float(ewm_var)
+        row.updated_at = now
+
+
+def detect_anomalies(db: Session, business_id: int, rows: List[dict]) -> Dict:
+    """
+    Anomaly stage run after a batch of transactions is flushed. Work is
+    proportional to the batch: statistics are read for the batch's
+    categories only, and duplicate lookups stay inside its date window.
+    The caller commits.
+    """
+    if not rows:
+        return {"outliers": 0, "duplicates": 0}
+
+    batch = pd.DataFrame(rows)[["id", "date", "amount", "transaction_type", "category", "description"]]
+    batch["date"] = pd.to_datetime(batch["date"])
+    batch["amount"] = batch["amount"].astype(float)
+
+    stats = _load_stats(db, business_id, batch["category"].unique().tolist())
+    outliers = _score_outliers(batch, stats)
+    duplicates = _find_duplicates(db, business_id, batch)
+
+    records = [
+        {"business_id": business_id, "transaction_id": int(r.id), "kind": OUTLIER,
+         "score": float(r.score), "expected_amount": float(r.expected_amount)}
+        for r in outliers.itertuples(index=False)
+    ] + [
+        {"business_id": business_id, "transaction_id": int(r.id), "kind": DUPLICATE,
+         "duplicate_of": int(r.duplicate_of)}
+        for r in duplicates.itertuples(index=False)
+    ]
+    if records:
+        db.bulk_insert_mappings(TransactionAnomaly, records)
+
+    # Duplicates would double count in the running statistics
+    _update_stats(db, business_id, batch[~batch["id"].isin(duplicates["id"])], stats)
+    return {"outliers": len(outliers), "duplicates": len(duplicates)}
+
+
+def list_anomalies(db: Session, business_id: int, limit: int, cursor: Optional[str] = None,
+                   kind: Optional[str] = None) -> Dict:
+    """
+    Newest anomalies first, keyset-paginated on anomaly id.
+    """
+    limit = clamp_limit(limit)
+    query = db.query(
+        TransactionAnomaly.id,
+        TransactionAnomaly.kind,
+        TransactionAnomaly.score,
+        TransactionAnomaly.expected_amount,
+        TransactionAnomaly.duplicate_of,
+        TransactionAnomaly.transaction_id,
+        Transaction.date,
+        Transaction.description,
+        Transaction.amount,
+        Transaction.transaction_type,
+        Transaction.category,
+    ).join(Transaction, Transaction.id == TransactionAnomaly.transaction_id).filter(
+        TransactionAnomaly.business_id == business_id
+    )
+    if kind:
+        query = query.filter(TransactionAnomaly.kind == kind)
+    if cursor:
+        (last_id,) = decode_cursor(cursor, 1)
+        if not isinstance(last_id, int):
+            raise ValueError("Malformed cursor")
+        query = query.filter(TransactionAnomaly.id < last_id)
+
+    rows = query.order_by(TransactionAnomaly.id.desc()).limit(limit + 1).all()
+    items = [row._asdict() for row in rows[:limit]]
+    next_cursor = encode_cursor([items[-1]["id"]]) if len(rows) > limit else None
+    return {"items": items, "next_cursor": next_cursor}
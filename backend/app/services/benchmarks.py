@@ -0,0 +1,172 @@
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, Optional, Tuple
+
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from ..models.financial import HealthSnapshot, IndustrySketch, PeerSample
+from .quantile_sketch import KLLSketch
+
+PEER_METRICS = ("current_ratio", "net_margin", "scale")
+
+# Below this many samples the static DEFAULT_BENCHMARKS stay in charge
+MIN_PEER_SAMPLES = 20
+
+# (industry, metric) -> (count, updated_at, KLLSketch). The sketch bytes are
+# only re-read when the row's count/updated_at no longer match, since other
+# workers fold in samples without touching this process
+_sketch_cache: Dict[Tuple[str, str], Tuple[int, Optional[datetime], KLLSketch]] = {}
+
+
+def _metric_values(metrics: Dict) -> Dict[str, float]:
+    return {
+        "current_ratio": metrics.get("current_ratio"),
+        "net_margin": metrics.get("net_margin"),
+        "scale": metrics.get("total_income"),
+    }
+
+
+def _period(now: datetime) -> str:
+    return now.strftime("%Y-%m")
+
+
+def _upsert(db: Session, model, values: Dict, keys: Tuple[str, ...], update: Tuple[str, ...] = ()):
+    """
+    INSERT ... ON CONFLICT on the unique keys, so concurrent workers creating
+    the same row don't fail on the constraint. Other dialects fall back to a
+    read-then-write.
+    """
+    dialect = db.bind.dialect.name
+    if dialect in ("postgresql", "sqlite"):
+        insert = postgresql.insert if dialect == "postgresql" else sqlite.insert
+        stmt = insert(model).values(**values)
+        if update:
+            stmt = stmt.on_conflict_do_update(index_elements=list(keys), set_={c: stmt.excluded[c] for c in update})
+        else:
+            stmt = stmt.on_conflict_do_nothing(index_elements=list(keys))
+        db.execute(stmt)
+        return
+
+    row = db.query(model).filter_by(**{k: values[k] for k in keys}).first()
+    if row is None:
+        db.add(model(**values))
+    else:
+        for c in update:
+            setattr(row, c, values[c])
+    db.flush()
+
+
+def get_sketch(db: Session, industry: str, metric: str) -> KLLSketch:
+    key = (industry, metric)
+    current = db.query(IndustrySketch.count, IndustrySketch.updated_at).filter(
+        IndustrySketch.industry == industry, IndustrySketch.metric == metric
+    ).first()
+    if current is None:
+        _sketch_cache.pop(key, None)
+        return KLLSketch()
+
+    cached = _sketch_cache.get(key)
+    if cached and cached[0] == current.count and cached[1] == current.updated_at:
+        return cached[2]
+
+    row = db.query(IndustrySketch.sketch).filter(
+        IndustrySketch.industry == industry, IndustrySketch.metric == metric
+    ).first()
+    sketch = KLLSketch.from_bytes(row.sketch)
+    _sketch_cache[key] = (current.count, current.updated_at, sketch)
+    return sketch
+
+
+def fold_closed_samples(db: Session, now: Optional[datetime] = None) -> int:
+    """
+    Folds each business's final sample for every closed month into the
+    industry sketches, exactly once. Sketch rows are created with ON CONFLICT
+    and re-read under a row lock, so concurrent workers merge into the latest
+    state instead of overwriting each other. The caller commits.
+    """
+    now = now or datetime.utcnow()
+    pending = db.query(PeerSample).filter(
+        PeerSample.sketched.is_(False),
+        PeerSample.period < _period(now),
+    ).with_for_update(skip_locked=True).all()
+    if not pending:
+        return 0
+
+    by_industry = defaultdict(list)
+    for sample in pending:
+        by_industry[sample.industry].append(sample)
+
+    for industry, samples in by_industry.items():
+        for metric in PEER_METRICS:
+            _upsert(db, IndustrySketch, {
+                "industry": industry, "metric": metric, "sketch": KLLSketch().to_bytes(), "count": 0, "updated_at": now,
+            }, keys=("industry", "metric"))
+            row = db.query(IndustrySketch).filter(
+                IndustrySketch.industry == industry, IndustrySketch.metric == metric
+            ).with_for_update().populate_existing().one()
+            sketch = KLLSketch.from_bytes(row.sketch)
+            for sample in samples:
+                sketch.update(getattr(sample, metric))
+            row.sketch = sketch.to_bytes()
+            row.count = sketch.n
+            row.updated_at = now
+            _sketch_cache[(industry, metric)] = (row.count, row.updated_at, sketch)
+
+    for sample in pending:
+        sample.sketched = True
+    return len(pending)
+
+
+def record_snapshot(db: Session, business_id: int, industry: str, analysis: Dict) -> Optional[HealthSnapshot]:
+    """
+    Stores a HealthSnapshot and makes it the business's peer sample for the
+    current month. A month's sample only reaches the industry sketches once
+    the month has closed, so each business contributes its latest figures
+    once per month however often it uploads.
+    """
+    metrics = analysis.get("metrics", {})
+    if metrics.get("status") == "No Data":
+        return None
+
+    now = datetime.utcnow()
+    snapshot = HealthSnapshot(
+        business_id=business_id,
+        overall_score=analysis["overall_score"],
+        liquidity_ratio=metrics.get("current_ratio"),
+    )
+    db.add(snapshot)
+
+    values = {"business_id": business_id, "industry": industry, "period": _period(now), "updated_at": now,
+              "sketched": False, **_metric_values(metrics)}
+    _upsert(db, PeerSample, values, keys=("business_id", "period"),
+            update=("industry", "updated_at", *PEER_METRICS))
+
+    fold_closed_samples(db, now)
+    db.commit()
+    return snapshot
+
+
+def get_peer_targets(db: Session, industry: str) -> Optional[Dict[str, float]]:
+    """
+    Industry medians to benchmark against, or None while the peer group is too small.
+    """
+    targets = {}
+    for metric in ("current_ratio", "net_margin"):
+        sketch = get_sketch(db, industry, metric)
+        if sketch.n < MIN_PEER_SAMPLES:
+            return None
+        targets[metric] = sketch.quantile(0.5)
+    return targets
+
+
+def get_peer_percentiles(db: Session, industry: str, metrics: Dict) -> Dict[str, Optional[float]]:
+    """
+    Percentile rank of each metric within the industry, read straight from the sketches.
+    sample_count is the number of closed business-month samples behind the ranks.
+    """
+    ranks = {"sample_count": get_sketch(db, industry, "current_ratio").n}
+    for metric, value in _metric_values(metrics).items():
+        sketch = get_sketch(db, industry, metric)
+        ranks[metric] = sketch.percentile_rank(value) if value is not None else None
+    return ranks
@@ -1,6 +1,9 @@
 from sqlalchemy.orm import Session
 from ..models.financial import BusinessContext, IndustryType
 from ..core.security import encrypt_data, decrypt_data
+from ..core.encoding import dumps
+from . import retention
+from .pagination import STREAM_BATCH_SIZE, clamp_limit, decode_cursor, encode_cursor
 
 def create_business_context(db: Session, name: str, industry: str, gst_number: str = None):
     # Ensure industry is valid
@@ -18,6 +21,11 @@ def create_business_context(db: Session, name: str, industry: str, gst_number: s
     db.add(db_business)
     db.commit()
     db.refresh(db_business)
+    
+    # Businesses get their own partition when transactions are partitioned by business
+    if retention.partitioning_scheme(db) == "business":
+        retention.ensure_partition(db.connection(), "business", db_business.id)
+        db.commit()
     return db_business
 
 def get_business_context(db: Session, business_id: int):
@@ -28,5 +36,30 @@ def get_business_context(db: Session, business_id: int):
         business.gst_number = decrypt_data(business.gst_number)
     return business
 
-def list_businesses(db: Session):
-    return db.query(BusinessContext).all()
+def business_exists(db: Session, business_id: int) -> bool:
+    # Existence check that doesn't load (and decrypt) the row
+    return db.query(BusinessContext.id).filter(BusinessContext.id == business_id).first() is not None
+
+def list_businesses(db: Session, limit: int, cursor: str = None):
+    """
+    One keyset page of businesses ordered by id.
+    """
+    limit = clamp_limit(limit)
+    query = _business_rows(db, cursor).limit(limit + 1)
+    items = [row._asdict() for row in query.all()]
+    next_cursor = encode_cursor([items[limit - 1]["id"]]) if len(items) > limit else None
+    return {"items": items[:limit], "next_cursor": next_cursor}
+
+def stream_businesses(db: Session, cursor: str = None):
+    query = _business_rows(db, cursor)
+    return (dumps(row._asdict()) + b"\n" for row in query.yield_per(STREAM_BATCH_SIZE))
+
+def _business_rows(db: Session, cursor: str = None):
+    # GST numbers stay out of listings; they are only decrypted per business
+    query = db.query(BusinessContext.id, BusinessContext.name, BusinessContext.industry, BusinessContext.created_at)
+    if cursor:
+        (last_id,) = decode_cursor(cursor, 1)
+        if not isinstance(last_id, int):
+            raise ValueError("Malformed cursor")
+        query = query.filter(BusinessContext.id > last_id)
+    return query.order_by(BusinessContext.id)
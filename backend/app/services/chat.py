@@ -0,0 +1,194 @@
+import json
+import os
+import re
+import threading
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Dict, Iterator, List, Optional, Tuple
+
+HELP_MESSAGE = "I can help analyze your profits, cash flow trends, or suggest funding options. What would you like to know?"
+NO_DATA_MESSAGE = "I don't have any transactions for your business yet. Upload a statement and I'll answer from your own numbers."
+
+# Ordered: the first intent whose keywords appear in the question wins.
+# "credit score" is matched up front so the bare "credit" of a loan
+# question doesn't claim it
+INTENT_KEYWORDS: List[Tuple[str, Tuple[str, ...]]] = [
+    ("score", ("credit score",)),
+    ("profit", ("profit", "margin")),
+    ("loan", ("loan", "borrow", "credit", "funding")),
+    ("expense", ("cost", "expense", "spend")),
+    ("revenue", ("revenue", "income", "sales")),
+    ("cashflow", ("cash", "burn", "runway")),
+    ("score", ("score", "health", "rating")),
+]
+
+RESPONSE_CACHE_SIZE = 1024
+
+
+def detect_intent(message: str) -> str:
+    msg = message.lower()
+    for intent, keywords in INTENT_KEYWORDS:
+        if any(k in msg for k in keywords):
+            return intent
+    return "help"
+
+
+def _money(value: float) -> str:
+    return f"{value:,.0f}"
+
+
+class ChatGenerator(ABC):
+    """
+    Backend interface for the CFO chat. Implementations yield the answer in
+    chunks so the endpoint can stream them; an LLM client would pass the facts
+    as grounding context in its prompt.
+    """
+    name = "base"
+
+    @abstractmethod
+    def stream(self, message: str, intent: str, facts: Optional[Dict]) -> Iterator[str]:
+        """Yields answer chunks for one question."""
+
+
+class TemplateGenerator(ChatGenerator):
+    """
+    Local deterministic generator that fills answers from the fact index.
+    """
+    name = "template"
+
+    def stream(self, message: str, intent: str, facts: Optional[Dict]) -> Iterator[str]:
+        for sentence in self.answer(intent, facts):
+            yield sentence + " "
+
+    def answer(self, intent: str, facts: Optional[Dict]) -> List[str]:
+        if intent == "help":
+            return [HELP_MESSAGE]
+        if not facts or not facts.get("transaction_count"):
+            return [NO_DATA_MESSAGE]
+
+        metrics = facts["metrics"]
+        industry = facts["industry"]
+
+        if intent == "profit":
+            margin = metrics["net_margin"] * 100
+            return [
+                f"Your net profit margin is {margin:.1f}% on income of {_money(facts['total_income'])} "
+                f"against expenses of {_money(facts['total_expense'])}.",
+                f"Your profitability contributes {facts['score_drivers']['profitability']} of 40 points to your score.",
+            ]
+        if intent == "loan":
+            sentences = [
+                f"Your credit score is {facts['overall_score']}/100 with a current ratio of "
+                f"{metrics['current_ratio']} versus the {industry} benchmark of {metrics['target_benchmark']}.",
+            ]
+            if metrics["status"] == "Healthy":
+                sentences.append("That puts you in a good position for a working capital loan at favorable rates.")
+            else:
+                sentences.append("Improving liquidity before applying would help you secure better rates.")
+            return sentences
+        if intent == "expense":
+            top = facts["top_expense_categories"]
+            if not top:
+                return ["I don't see any expenses in your uploaded data."]
+            lead = top[0]
+            sentences = [
+                f"Your highest expense category is '{lead['category']}' at {_money(lead['amount'])} "
+                f"({lead['share'] * 100:.1f}% of spend).",
+            ]
+            if len(top) > 1:
+                rest = ", ".join(f"'{c['category']}' ({c['share'] * 100:.1f}%)" for c in top[1:])
+                sentences.append(f"It is followed by {rest}.")
+            return sentences
+        if intent == "revenue":
+            monthly = facts["monthly"]
+            last = monthly[-1]
+            sentences = [f"Total income is {_money(facts['total_income'])}, with {_money(last['income'])} in {last['month']}."]
+            if len(monthly) > 1:
+                prev = monthly[-2]
+                if prev["income"] > 0:
+                    change = (last["income"] - prev["income"]) / prev["income"] * 100
+                    sentences.append(f"That is {change:+.1f}% versus {prev['month']}.")
+            return sentences
+        if intent == "cashflow":
+            monthly = facts["monthly"]
+            avg_burn = sum(m["expense"] for m in monthly) / len(monthly)
+            last = monthly[-1]
+            return [
+                f"Your average monthly spend is {_money(avg_burn)}.",
+                f"In {last['month']} your net cash flow was {_money(last['net'])}.",
+            ]
+        if intent == "score":
+            drivers = facts["score_drivers"]
+            return [
+                f"Your health score is {facts['overall_score']}/100 ({metrics['status']}).",
+                f"Liquidity contributes {drivers['liquidity']}/40, profitability {drivers['profitability']}/40 "
+                f"and scale {drivers['scale']}/20.",
+            ]
+        return [HELP_MESSAGE]
+
+
+GENERATORS = {
+    TemplateGenerator.name: TemplateGenerator,
+}
+
+_generator: Optional[ChatGenerator] = None
+
+
+def get_generator() -> ChatGenerator:
+    global _generator
+    if _generator is None:
+        backend = os.getenv("CHAT_GENERATOR", TemplateGenerator.name)
+        _generator = GENERATORS.get(backend, TemplateGenerator)()
+    return _generator
+
+
+def set_generator(generator: ChatGenerator):
+    global _generator
+    _generator = generator
+    with _cache_lock:
+        _response_cache.clear()
+
+
+# Sync endpoints run in the threadpool, so every cache access takes the lock
+_response_cache: "OrderedDict[tuple, str]" = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def _cache_key(message: str, business_id: Optional[int], facts: Optional[Dict]) -> tuple:
+    normalized = " ".join(re.findall(r"\w+", message.lower()))
+    version = (facts.get("version"), facts.get("updated_at")) if facts else None
+    return (business_id, version, normalized)
+
+
+def stream_answer(message: str, business_id: Optional[int], facts: Optional[Dict]) -> Iterator[str]:
+    """
+    Yields answer chunks, serving repeated questions from the LRU cache.
+    """
+    key = _cache_key(message, business_id, facts)
+    with _cache_lock:
+        cached = _response_cache.get(key)
+        if cached is not None:
+            _response_cache.move_to_end(key)
+    if cached is not None:
+        yield cached
+        return
+
+    chunks = []
+    for chunk in get_generator().stream(message, detect_intent(message), facts):
+        chunks.append(chunk)
+        yield chunk
+
+    with _cache_lock:
+        _response_cache[key] = "".join(chunks)
+        if len(_response_cache) > RESPONSE_CACHE_SIZE:
+            _response_cache.popitem(last=False)
+
+
+def answer(message: str, business_id: Optional[int], facts: Optional[Dict]) -> str:
+    return "".join(stream_answer(message, business_id, facts)).strip()
+
+
+def sse_events(message: str, business_id: Optional[int], facts: Optional[Dict]) -> Iterator[str]:
+    for chunk in stream_answer(message, business_id, facts):
+        yield f"data: {json.dumps({'delta': chunk})}\n\n"
+    yield "event: done\ndata: {}\n\n"
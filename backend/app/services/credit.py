@@ -0,0 +1,234 @@
+import json
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import case, func, or_
+from sqlalchemy.orm import Session
+
+from ..models.financial import Transaction
+
+CREDIT_PRODUCTS_FILE = Path(__file__).resolve().parent.parent / "data" / "credit_products.json"
+
+# Expense descriptions that indicate existing debt repayments
+DEBT_KEYWORDS = ("emi", "loan", "interest", "repayment")
+
+# DSCR with no existing debt is unbounded; cap it so it stays comparable
+DSCR_CAP = 10.0
+
+# Coefficient of variation reported when there is no income to measure it
+# against; far above any product's max_volatility so such businesses never qualify
+NO_INCOME_VOLATILITY = 10.0
+
+FEATURES = ("dscr", "receivables_regularity", "income_volatility", "avg_monthly_income",
+            "avg_monthly_debt_service", "noi", "months")
+
+
+def load_product_catalog(path: Path = CREDIT_PRODUCTS_FILE) -> Dict:
+    """
+    Loads the partner product catalog into column arrays for the rule matrix.
+    """
+    with open(path, encoding="utf-8") as f:
+        products = json.load(f)
+    columns = ("min_dscr", "min_regularity", "max_volatility", "min_monthly_income",
+               "min_months", "annual_rate", "tenure_months", "max_amount")
+    catalog = {col: np.array([p[col] for p in products], dtype=float) for col in columns}
+    catalog["products"] = products
+    return catalog
+
+
+PRODUCT_CATALOG = load_product_catalog()
+
+
+def reload_product_catalog(path: Path = CREDIT_PRODUCTS_FILE) -> Dict:
+    # Called when partners publish a refreshed catalog
+    global PRODUCT_CATALOG
+    PRODUCT_CATALOG = load_product_catalog(path)
+    return PRODUCT_CATALOG
+
+
+def _month_expr(db: Session):
+    if db.bind.dialect.name == "sqlite":
+        return func.strftime("%Y-%m", Transaction.date)
+    return func.to_char(Transaction.date, "YYYY-MM")
+
+
+def load_monthly_aggregates(db: Session, business_ids: Optional[Sequence[int]] = None) -> pd.DataFrame:
+    """
+    Monthly income, expense and debt service per business, aggregated in SQL.
+    """
+    month = _month_expr(db)
+    is_income = Transaction.transaction_type == "Income"
+    is_debt = (Transaction.transaction_type == "Expense") & or_(
+        *[func.lower(Transaction.description).like(f"%{k}%") for k in DEBT_KEYWORDS]
+    )
+    query = db.query(
+        Transaction.business_id.label("business_id"),
+        month.label("month"),
+        func.sum(case((is_income, Transaction.amount), else_=0)).label("income"),
+        func.sum(case((is_income, 0), else_=Transaction.amount)).label("expense"),
+        func.sum(case((is_debt, Transaction.amount), else_=0)).label("debt_service"),
+    ).filter(Transaction.business_id.isnot(None))
+    if business_ids is not None:
+        query = query.filter(Transaction.business_id.in_(list(business_ids)))
+    rows = query.group_by(Transaction.business_id, month).all()
+    return pd.DataFrame(
+        [row._asdict() for row in rows],
+        columns=["business_id", "month", "income", "expense", "debt_service"],
+    )
+
+
+def compute_credit_features(monthly: pd.DataFrame) -> pd.DataFrame:
+    """
+    Derives DSCR, receivables regularity and income volatility per business.
+    Months without activity inside a business's history count as zero income.
+    """
+    if monthly.empty:
+        return pd.DataFrame(columns=list(FEATURES))
+
+    monthly = monthly.copy()
+    periods = pd.PeriodIndex(monthly["month"], freq="M")
+    monthly["period"] = periods.asi8
+    monthly["income_sq"] = monthly["income"] ** 2
+
+    grouped = monthly.groupby("business_id")
+    span = grouped["period"].max() - grouped["period"].min() + 1
+    income_total = grouped["income"].sum()
+    expense_total = grouped["expense"].sum()
+    debt_total = grouped["debt_service"].sum()
+    income_months = monthly[monthly["income"] > 0].groupby("business_id").size().reindex(span.index, fill_value=0)
+
+    avg_income = income_total / span
+    avg_debt = debt_total / span
+    # Operating income before existing debt repayments
+    noi = (income_total - (expense_total - debt_total)) / span
+
+    # Volatility over the full span, padding inactive months with zero income
+    sum_sq = grouped["income_sq"].sum()
+    variance = (sum_sq / span - avg_income ** 2).clip(lower=0)
+    volatility = np.sqrt(variance) / avg_income.where(avg_income > 0)
+
+    dscr = (noi / avg_debt.where(avg_debt > 0)).fillna(DSCR_CAP)
+    dscr = dscr.where(noi > 0, 0).clip(upper=DSCR_CAP)
+
+    return pd.DataFrame({
+        "dscr": dscr,
+        "receivables_regularity": income_months / span,
+        "income_volatility": volatility.fillna(NO_INCOME_VOLATILITY),
+        "avg_monthly_income": avg_income,
+        "avg_monthly_debt_service": avg_debt,
+        "noi": noi,
+        "months": span,
+    })
+
+
+def evaluate_products(features: pd.DataFrame, catalog: Optional[Dict] = None) -> Dict[str, np.ndarray]:
+    """
+    Evaluates every product against every business in one NumPy pass.
+    Returns (businesses x products) matrices for eligibility, match score and
+    maximum sanctionable amount.
+    """
+    catalog = catalog or PRODUCT_CATALOG
+    dscr = features["dscr"].to_numpy(dtype=float)[:, None]
+    regularity = features["receivables_regularity"].to_numpy(dtype=float)[:, None]
+    volatility = features["income_volatility"].to_numpy(dtype=float)[:, None]
+    income = features["avg_monthly_income"].to_numpy(dtype=float)[:, None]
+    months = features["months"].to_numpy(dtype=float)[:, None]
+    noi = features["noi"].to_numpy(dtype=float)[:, None]
+    debt = features["avg_monthly_debt_service"].to_numpy(dtype=float)[:, None]
+
+    eligible = (
+        (dscr >= catalog["min_dscr"])
+        & (regularity >= catalog["min_regularity"])
+        & (volatility <= catalog["max_volatility"])
+        & (income >= catalog["min_monthly_income"])
+        & (months >= catalog["min_months"])
+    )
+
+    # Headroom over each threshold, 0..1, averaged into a 60..100 match score
+    headroom = np.stack([
+        np.clip((dscr - catalog["min_dscr"]) / catalog["min_dscr"], 0, 1),
+        np.clip((regularity - catalog["min_regularity"]) / np.maximum(1 - catalog["min_regularity"], 1e-9), 0, 1),
+        np.clip((catalog["max_volatility"] - volatility) / catalog["max_volatility"], 0, 1),
+    ])
+    match_score = np.where(eligible, np.rint(60 + 40 * headroom.mean(axis=0)), 0).astype(int)
+
+    # New EMI that keeps DSCR at the product minimum, discounted over the tenure
+    emi_capacity = np.clip(noi / catalog["min_dscr"] - debt, 0, None)
+    r = catalog["annual_rate"] / 12
+    n = catalog["tenure_months"]
+    annuity = (1 - (1 + r) ** -n) / r
+    max_amount = np.where(eligible, np.minimum(emi_capacity * annuity, catalog["max_amount"]), 0)
+    max_amount = (np.floor(max_amount / 1000) * 1000).astype(int)
+
+    return {"eligible": eligible & (max_amount > 0), "match_score": match_score, "max_amount": max_amount}
+
+
+def _products_for_row(result: Dict[str, np.ndarray], i: int, catalog: Dict) -> List[Dict]:
+    order = np.argsort(-result["match_score"][i], kind="stable")
+    recommended = []
+    for j in order:
+        if not result["eligible"][i, j]:
+            continue
+        product = catalog["products"][j]
+        recommended.append({
+            "type": product["type"],
+            "provider": product["provider"],
+            "match_score": int(result["match_score"][i, j]),
+            "max_amount": int(result["max_amount"][i, j]),
+            "est_rate": f"{product['annual_rate'] * 100:.1f}%",
+            "reason": product["reason"],
+        })
+    return recommended
+
+
+def assess_business(db: Session, business_id: int) -> Dict:
+    features = compute_credit_features(load_monthly_aggregates(db, [business_id]))
+    if features.empty:
+        return {
+            "eligible": False,
+            "max_loan_amount": 0,
+            "metrics": None,
+            "recommended_products": [],
+        }
+
+    catalog = PRODUCT_CATALOG
+    result = evaluate_products(features, catalog)
+    products = _products_for_row(result, 0, catalog)
+    row = features.iloc[0]
+    return {
+        "eligible": bool(products),
+        "max_loan_amount": int(result["max_amount"][0].max()),
+        "metrics": {
+            "dscr": round(float(row["dscr"]), 2),
+            "receivables_regularity": round(float(row["receivables_regularity"]), 2),
+            "income_volatility": round(float(row["income_volatility"]), 2),
+            "avg_monthly_income": round(float(row["avg_monthly_income"]), 2),
+            "months_of_history": int(row["months"]),
+        },
+        "recommended_products": products,
+    }
+
+
+def rank_portfolio(db: Session, top_n: int = 3) -> List[Dict]:
+    """
+    Re-ranks every business against the current catalog, e.g. after a partner refresh.
+    """
+    if top_n < 1:
+        raise ValueError("top_n must be at least 1")
+    features = compute_credit_features(load_monthly_aggregates(db))
+    if features.empty:
+        return []
+
+    catalog = PRODUCT_CATALOG
+    result = evaluate_products(features, catalog)
+    max_loan = result["max_amount"].max(axis=1)
+    return [
+        {
+            "business_id": int(business_id),
+            "max_loan_amount": int(max_loan[i]),
+            "recommended_products": _products_for_row(result, i, catalog)[:top_n],
+        }
+        for i, business_id in enumerate(features.index)
+    ]
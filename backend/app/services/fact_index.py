@@ -0,0 +1,135 @@
+import json
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import pandas as pd
+from sqlalchemy.orm import Session
+
+from ..models.financial import BusinessContext, BusinessFacts, Transaction
+from .analytics import calculate_industry_ratios
+from .benchmarks import get_peer_targets
+
+TOP_CATEGORIES = 3
+
+# business_id -> facts dict. Entries are only served after checking the
+# row's version/updated_at, since other workers and the retention CLI
+# rewrite or delete facts without touching this process
+_facts_cache: Dict[int, Dict] = {}
+
+
+def load_transactions(db: Session, business_id: int) -> List[dict]:
+    rows = db.query(
+        Transaction.amount,
+        Transaction.transaction_type,
+        Transaction.date,
+        Transaction.category,
+        Transaction.description,
+    ).filter(Transaction.business_id == business_id).all()
+    return [row._asdict() for row in rows]
+
+
+def _top_categories(df: pd.DataFrame, t_type: str) -> List[Dict]:
+    subset = df[df["transaction_type"] == t_type]
+    total = subset["amount"].sum()
+    if subset.empty or total <= 0:
+        return []
+    grouped = subset.groupby("category")["amount"].sum().nlargest(TOP_CATEGORIES)
+    return [
+        {"category": cat, "amount": round(float(amt), 2), "share": round(float(amt / total), 4)}
+        for cat, amt in grouped.items()
+    ]
+
+
+def build_facts(transactions: List[dict], industry: str, peer_targets: Optional[Dict] = None) -> Dict:
+    """
+    Precomputes everything the CFO chat may quote for one business.
+    """
+    analysis = calculate_industry_ratios(transactions, industry, peer_targets)
+    facts = {
+        "industry": industry,
+        "transaction_count": len(transactions),
+        "overall_score": analysis["overall_score"],
+        "metrics": analysis["metrics"],
+        "score_drivers": analysis["score_drivers"],
+        "monthly": [],
+        "top_expense_categories": [],
+        "top_income_categories": [],
+    }
+    if not transactions:
+        return facts
+
+    df = pd.DataFrame(transactions)
+    df["date"] = pd.to_datetime(df["date"])
+    df["month"] = df["date"].dt.strftime("%Y-%m")
+
+    pivot = df.pivot_table(index="month", columns="transaction_type", values="amount", aggfunc="sum", fill_value=0)
+    for month, row in pivot.sort_index().iterrows():
+        income = float(row.get("Income", 0))
+        expense = float(row.get("Expense", 0))
+        facts["monthly"].append({
+            "month": month,
+            "income": round(income, 2),
+            "expense": round(expense, 2),
+            "net": round(income - expense, 2),
+        })
+
+    facts["total_income"] = round(float(df[df["transaction_type"] == "Income"]["amount"].sum()), 2)
+    facts["total_expense"] = round(float(df[df["transaction_type"] == "Expense"]["amount"].sum()), 2)
+    facts["top_expense_categories"] = _top_categories(df, "Expense")
+    facts["top_income_categories"] = _top_categories(df, "Income")
+    facts["period"] = {"start": df["date"].min().isoformat(), "end": df["date"].max().isoformat()}
+    return facts
+
+
+def _stamp(value: Optional[datetime]) -> Optional[str]:
+    return value.isoformat() if value else None
+
+
+def rebuild_facts(db: Session, business_id: int) -> Optional[Dict]:
+    """
+    Recomputes and persists the fact index. Called after each ingest.
+    """
+    biz = db.query(BusinessContext.industry).filter(BusinessContext.id == business_id).first()
+    if not biz:
+        return None
+
+    facts = build_facts(load_transactions(db, business_id), biz.industry, get_peer_targets(db, biz.industry))
+    row = db.query(BusinessFacts).filter(BusinessFacts.business_id == business_id).first()
+    if row:
+        row.version = (row.version or 0) + 1
+    else:
+        row = BusinessFacts(business_id=business_id, version=1)
+        db.add(row)
+    # updated_at disambiguates a version 1 written after the business was erased and re-created
+    row.updated_at = datetime.utcnow()
+    facts["version"] = row.version
+    facts["updated_at"] = _stamp(row.updated_at)
+    row.facts = json.dumps(facts)
+    db.commit()
+
+    _facts_cache[business_id] = facts
+    return facts
+
+
+def get_facts(db: Session, business_id: int) -> Optional[Dict]:
+    current = db.query(BusinessFacts.version, BusinessFacts.updated_at).filter(
+        BusinessFacts.business_id == business_id
+    ).first()
+    if not current:
+        _facts_cache.pop(business_id, None)
+        return None
+
+    cached = _facts_cache.get(business_id)
+    if cached and cached.get("version") == current.version and cached.get("updated_at") == _stamp(current.updated_at):
+        return cached
+
+    row = db.query(BusinessFacts.facts).filter(BusinessFacts.business_id == business_id).first()
+    facts = json.loads(row.facts)
+    facts["version"] = current.version
+    facts["updated_at"] = _stamp(current.updated_at)
+    _facts_cache[business_id] = facts
+    return facts
+
+
+def invalidate_facts(business_id: int):
+    _facts_cache.pop(business_id, None)
@@ -0,0 +1,479 @@
+import io
+import itertools
+import json
+import re
+from datetime import datetime, timedelta
+from typing import BinaryIO, Dict, Iterator, Optional
+
+import numpy as np
+import pandas as pd
+from fastapi import HTTPException
+from sqlalchemy import func, or_
+from sqlalchemy.orm import Session, aliased
+
+from ..models.financial import GstFiling, GstReturnLine, Transaction
+
+# Lines parsed, matched and written per batch; bounds memory for 1M-line returns
+CHUNK_SIZE = 50000
+
+# Portal JSON documents are parsed whole, so they are capped; larger returns
+# must be uploaded as CSV or JSON Lines, which are streamed in chunks
+MAX_JSON_BYTES = 50 * 1024 * 1024
+
+# A return line and a transaction may be this many days apart and still match
+DATE_WINDOW_DAYS = 7
+
+# Amount tolerance: the larger of an absolute rupee slack and a relative one
+AMOUNT_TOLERANCE_ABS = 1.0
+AMOUNT_TOLERANCE_REL = 0.005
+
+# Outward returns are matched to Income, inward (ITC) returns to Expense
+RETURN_TYPES = {
+    "GSTR-1": "Income",
+    "GSTR-2A": "Expense",
+    "GSTR-2B": "Expense",
+}
+
+# GSTR-2B is the static ITC statement for a period and supersedes the
+# running GSTR-2A view wherever both have been uploaded
+SUPERSEDED_BY = {"GSTR-2A": "GSTR-2B"}
+
+PERIOD_PATTERN = re.compile(r"^\d{4}-(0[1-9]|1[0-2])$")
+
+# Tried after ISO 8601; the portal writes invoice dates as dd-mm-yyyy
+PORTAL_DATE_FORMATS = ("%d-%m-%Y", "%d/%m/%Y")
+
+MATCHED = "matched"
+MATCHED_BY_AMOUNT = "matched_by_amount"
+AMOUNT_MISMATCH = "amount_mismatch"
+DATE_MISMATCH = "date_mismatch"
+MISSING_IN_BOOKS = "missing_in_books"
+INVALID_DATE = "invalid_date"
+AT_RISK_STATUSES = (AMOUNT_MISMATCH, DATE_MISMATCH, MISSING_IN_BOOKS, INVALID_DATE)
+
+# Lines of filings in these states never claim transactions
+INACTIVE_FILING_STATUSES = ("Superseded", "Failed")
+
+COLUMN_MAP = {
+    "inum": "invoice_number", "invoice_no": "invoice_number", "invoice": "invoice_number",
+    "dt": "invoice_date", "date": "invoice_date",
+    "val": "invoice_value", "value": "invoice_value", "amount": "invoice_value",
+    "ctin": "counterparty_gstin", "gstin": "counterparty_gstin", "supplier_gstin": "counterparty_gstin",
+}
+TAX_COLUMNS = ("igst", "cgst", "sgst", "cess", "tax_amount")
+
+INVOICE_PATTERN = r"(?i)\binv(?:oice)?(?![a-z])(?:\s*(?:no|num(?:ber)?)\b)?[\s.#:/\-]*([A-Za-z0-9][A-Za-z0-9/\-]*)"
+
+
+def normalize_invoice_keys(values: pd.Series) -> pd.Series:
+    # "INV/0042", "inv-42" and "INV 0042" all map to the same key
+    keys = values.astype(str).str.upper().str.replace(r"[^A-Z0-9]", "", regex=True)
+    keys = keys.str.replace(r"^(INVOICE|INV)", "", regex=True).str.replace(r"^0+(?=.)", "", regex=True)
+    return keys.where(keys != "", None)
+
+
+def parse_invoice_dates(values: pd.Series) -> pd.Series:
+    """
+    Parses every value on its own: ISO 8601 first, then the portal formats
+    for whatever is left. Unparseable values stay NaT.
+    """
+    raw = values.astype(str).str.strip()
+    dates = pd.to_datetime(raw, errors="coerce", format="ISO8601")
+    for fmt in PORTAL_DATE_FORMATS:
+        if not dates.isna().any():
+            break
+        dates = dates.fillna(pd.to_datetime(raw.where(dates.isna()), errors="coerce", format=fmt))
+    return dates
+
+
+def _normalize_lines(df: pd.DataFrame) -> pd.DataFrame:
+    df.columns = [str(c).lower().strip().replace(" ", "_") for c in df.columns]
+    df = df.rename(columns={k: v for k, v in COLUMN_MAP.items() if k in df.columns and v not in df.columns})
+    missing = [c for c in ("invoice_number", "invoice_date", "invoice_value") if c not in df.columns]
+    if missing:
+        raise HTTPException(status_code=400, detail=f"Missing required GST columns: {', '.join(missing)}")
+
+    tax_cols = [c for c in TAX_COLUMNS if c in df.columns]
+    out = pd.DataFrame({
+        "invoice_number": df["invoice_number"].astype(str).str.strip(),
+        "invoice_date": parse_invoice_dates(df["invoice_date"]),
+        "invoice_value": pd.to_numeric(df["invoice_value"], errors="coerce").fillna(0.0).abs(),
+        "tax_amount": df[tax_cols].apply(pd.to_numeric, errors="coerce").fillna(0.0).sum(axis=1) if tax_cols else 0.0,
+        "counterparty_gstin": df["counterparty_gstin"].astype(str) if "counterparty_gstin" in df.columns else None,
+    })
+    out["invoice_key"] = normalize_invoice_keys(out["invoice_number"])
+    # Lines with unparseable dates are kept and reported as invalid_date by match_chunk
+    return out.reset_index(drop=True)
+
+
+def _flatten_gstr_json(doc: Dict) -> Iterator[Dict]:
+    # GSTR-1 / GSTR-2B portal exports nest invoices under b2b -> ctin -> inv
+    data = doc.get("data", doc)
+    data = data.get("docdata", data)
+    for supplier in data.get("b2b", []):
+        for inv in supplier.get("inv", []):
+            row = {k: v for k, v in inv.items() if not isinstance(v, (list, dict))}
+            row["ctin"] = supplier.get("ctin")
+            for item in inv.get("itms", []):
+                detail = item.get("itm_det", item)
+                for col in ("igst", "cgst", "sgst", "cess"):
+                    row[col] = row.get(col, 0) + (detail.get(col) or detail.get(col[0] + "amt") or 0)
+            yield row
+
+
+def iter_return_chunks(file: BinaryIO, filename: str, chunk_size: int = CHUNK_SIZE) -> Iterator[pd.DataFrame]:
+    """
+    Streams a GST return as normalized DataFrame chunks.
+    CSV and JSON Lines are read incrementally; a portal JSON document is
+    parsed once and then emitted in chunks.
+    """
+    filename = filename.lower()
+    if filename.endswith(".csv"):
+        for chunk in pd.read_csv(file, chunksize=chunk_size, dtype=str):
+            yield _normalize_lines(chunk)
+        return
+
+    if filename.endswith((".jsonl", ".ndjson")):
+        reader = pd.read_json(io.TextIOWrapper(file, encoding="utf-8"), lines=True, chunksize=chunk_size, dtype=False)
+        for chunk in reader:
+            yield _normalize_lines(chunk)
+        return
+
+    if filename.endswith(".json"):
+        file.seek(0, io.SEEK_END)
+        size = file.tell()
+        file.seek(0)
+        if size > MAX_JSON_BYTES:
+            raise HTTPException(
+                status_code=400,
+                detail=f"JSON returns are limited to {MAX_JSON_BYTES // (1024 * 1024)} MB; upload larger returns as CSV or JSON Lines.",
+            )
+        try:
+            doc = json.load(file)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Could not parse GST return JSON.")
+        rows = doc if isinstance(doc, list) else _flatten_gstr_json(doc)
+        batch = []
+        for row in rows:
+            batch.append(row)
+            if len(batch) >= chunk_size:
+                yield _normalize_lines(pd.DataFrame(batch))
+                batch = []
+        if batch:
+            yield _normalize_lines(pd.DataFrame(batch))
+        return
+
+    raise HTTPException(status_code=400, detail="GST returns must be CSV, JSON or JSON Lines.")
+
+
+def _candidate_query(db: Session, filing: GstFiling):
+    # Transactions claimed by other active filings of the same return type
+    # are not candidates. GSTR-2A and GSTR-2B are separate views of the same
+    # purchases and may each match them, and a filing for the same period is
+    # about to be replaced by this one, so its matches are up for grabs too
+    others = db.query(GstFiling.id).filter(
+        GstFiling.business_id == filing.business_id,
+        GstFiling.return_type == filing.return_type,
+        GstFiling.status.notin_(INACTIVE_FILING_STATUSES),
+        or_(GstFiling.id == filing.id, GstFiling.period.is_(None), GstFiling.period != filing.period),
+    )
+    claimed = db.query(GstReturnLine.matched_transaction_id).filter(
+        GstReturnLine.business_id == filing.business_id,
+        GstReturnLine.filing_id.in_(others),
+        GstReturnLine.matched_transaction_id.isnot(None),
+    )
+    return db.query(Transaction.id, Transaction.date, Transaction.amount, Transaction.description).filter(
+        Transaction.business_id == filing.business_id,
+        Transaction.transaction_type == RETURN_TYPES[filing.return_type],
+        ~Transaction.id.in_(claimed),
+    )
+
+
+def _candidate_frame(rows) -> pd.DataFrame:
+    txns = pd.DataFrame([r._asdict() for r in rows], columns=["id", "date", "amount", "description"])
+    txns["date"] = pd.to_datetime(txns["date"])
+    txns["amount"] = txns["amount"].astype(float)
+    refs = txns["description"].astype(str).str.extract(INVOICE_PATTERN, expand=False)
+    txns["invoice_key"] = normalize_invoice_keys(refs).where(refs.notna(), None)
+    return txns
+
+
+def _load_candidate_transactions(db: Session, filing: GstFiling, start: datetime, end: datetime) -> pd.DataFrame:
+    return _candidate_frame(_candidate_query(db, filing).filter(
+        Transaction.date >= start,
+        Transaction.date <= end,
+    ).all())
+
+
+def _load_keyed_transactions(db: Session, filing: GstFiling) -> pd.DataFrame:
+    """
+    Every candidate that quotes an invoice number, whatever its date, so the
+    key join can report a date mismatch. INVOICE_PATTERN needs "inv" in the
+    description, which narrows the rows in SQL.
+    """
+    rows = _candidate_query(db, filing).filter(func.lower(Transaction.description).like("%inv%")).all()
+    txns = _candidate_frame(rows)
+    return txns[txns["invoice_key"].notna()].reset_index(drop=True)
+
+
+def _amount_ok(a: pd.Series, b: pd.Series) -> pd.Series:
+    tolerance = np.maximum(AMOUNT_TOLERANCE_ABS, AMOUNT_TOLERANCE_REL * np.maximum(a.abs(), b.abs()))
+    return (a - b).abs() <= tolerance
+
+
+def match_chunk(lines: pd.DataFrame, txns: pd.DataFrame, keyed_txns: Optional[pd.DataFrame] = None) -> pd.DataFrame:
+    """
+    Matches one chunk of return lines against candidate transactions.
+    Pass 1 hash-joins on invoice key against keyed_txns (by default the keyed
+    rows of txns); pass 2 matches what is left by amount within a sorted date
+    window (merge_asof) over txns. Each transaction is used once.
+    Lines without a parseable date are marked invalid_date and never matched.
+    """
+    lines = lines.copy()
+    lines["line_idx"] = np.arange(len(lines))
+    lines["match_status"] = np.where(lines["invoice_date"].isna(), INVALID_DATE, MISSING_IN_BOOKS)
+    lines["matched_transaction_id"] = pd.array([pd.NA] * len(lines), dtype="Int64")
+    if keyed_txns is None:
+        keyed_txns = txns[txns["invoice_key"].notna()]
+    if lines.empty or (txns.empty and keyed_txns.empty):
+        return lines
+
+    window = pd.Timedelta(days=DATE_WINDOW_DAYS)
+    used = set()
+
+    # Pass 1: hash join on invoice key
+    keyed_lines = lines[(lines["match_status"] == MISSING_IN_BOOKS) & lines["invoice_key"].notna()]
+    joined = keyed_lines.merge(keyed_txns[["id", "date", "amount", "invoice_key"]], on="invoice_key", how="inner")
+    if not joined.empty:
+        joined["amount_diff"] = (joined["invoice_value"] - joined["amount"]).abs()
+        joined = joined.sort_values(["line_idx", "amount_diff"]).drop_duplicates("line_idx").drop_duplicates("id")
+        amount_ok = _amount_ok(joined["invoice_value"], joined["amount"])
+        date_ok = (joined["invoice_date"] - joined["date"]).abs() <= window
+        status = np.where(amount_ok & date_ok, MATCHED, np.where(amount_ok, DATE_MISMATCH, AMOUNT_MISMATCH))
+        lines.loc[joined["line_idx"].to_numpy(), "match_status"] = status
+        lines.loc[joined["line_idx"].to_numpy(), "matched_transaction_id"] = joined["id"].to_numpy()
+        used.update(joined["id"].tolist())
+
+    # Pass 2: same amount (to the paisa) within the date window
+    remaining = lines[lines["match_status"] == MISSING_IN_BOOKS]
+    free = txns[~txns["id"].isin(used)]
+    if not remaining.empty and not free.empty:
+        left = remaining[["line_idx", "invoice_date", "invoice_value"]].assign(
+            amount_key=np.rint(remaining["invoice_value"] * 100).astype("int64")
+        ).sort_values("invoice_date")
+        right = free[["id", "date", "amount"]].assign(
+            amount_key=np.rint(free["amount"] * 100).astype("int64")
+        ).sort_values("date")
+        nearest = pd.merge_asof(
+            left, right, left_on="invoice_date", right_on="date", by="amount_key",
+            direction="nearest", tolerance=window,
+        ).dropna(subset=["id"])
+        nearest = nearest.drop_duplicates("id")
+        lines.loc[nearest["line_idx"].to_numpy(), "match_status"] = MATCHED_BY_AMOUNT
+        lines.loc[nearest["line_idx"].to_numpy(), "matched_transaction_id"] = nearest["id"].astype("int64").to_numpy()
+
+    return lines
+
+
+def _persist_lines(db: Session, filing: GstFiling, lines: pd.DataFrame):
+    matched_ids = lines["matched_transaction_id"]
+    records = [
+        {
+            "filing_id": filing.id,
+            "business_id": filing.business_id,
+            "counterparty_gstin": gstin,
+            "invoice_number": number,
+            "invoice_key": key,
+            "invoice_date": None if pd.isna(date) else date.to_pydatetime(),
+            "invoice_value": float(value),
+            "tax_amount": float(tax),
+            "match_status": status,
+            "matched_transaction_id": None if pd.isna(txn_id) else int(txn_id),
+        }
+        for gstin, number, key, date, value, tax, status, txn_id in zip(
+            lines["counterparty_gstin"], lines["invoice_number"], lines["invoice_key"], lines["invoice_date"],
+            lines["invoice_value"], lines["tax_amount"], lines["match_status"], matched_ids,
+        )
+    ]
+    db.bulk_insert_mappings(GstReturnLine, records)
+
+
+def _supersede_previous(db: Session, filing: GstFiling):
+    # A revised return for the same period replaces the earlier one and frees its matches
+    previous = db.query(GstFiling.id).filter(
+        GstFiling.business_id == filing.business_id,
+        GstFiling.return_type == filing.return_type,
+        GstFiling.period == filing.period,
+        GstFiling.id != filing.id,
+        GstFiling.status != "Superseded",
+    )
+    db.query(GstReturnLine).filter(GstReturnLine.filing_id.in_(previous)).delete(synchronize_session=False)
+    db.query(GstFiling).filter(GstFiling.id.in_(previous.scalar_subquery())).update(
+        {GstFiling.status: "Superseded"}, synchronize_session=False
+    )
+
+
+def reconcile_filing(db: Session, business_id: int, return_type: str, file: BinaryIO, filename: str,
+                     period: str) -> Dict:
+    """
+    Ingests a GST return for one period (YYYY-MM) and reconciles it chunk by
+    chunk against the books. Only transactions not matched by other filings
+    of the same return type are considered, so new filings can be reconciled
+    as they arrive without touching old results. An earlier filing for the
+    period is only superseded once the new one has reconciled.
+    """
+    return_type = return_type.upper()
+    if return_type not in RETURN_TYPES:
+        raise HTTPException(status_code=400, detail=f"Unsupported return type: {return_type}")
+    if not period or not PERIOD_PATTERN.match(period):
+        raise HTTPException(status_code=400, detail="Return period must be given as YYYY-MM.")
+
+    # Reading the first chunk validates the format and columns before anything is written
+    chunks = iter_return_chunks(file, filename)
+    first = next(chunks, None)
+
+    filing = GstFiling(business_id=business_id, return_type=return_type, period=period, source_file=filename)
+    db.add(filing)
+    db.commit()
+    db.refresh(filing)
+
+    window = timedelta(days=DATE_WINDOW_DAYS)
+    try:
+        keyed = _load_keyed_transactions(db, filing)
+        for chunk in itertools.chain([first] if first is not None else [], chunks):
+            if chunk.empty:
+                continue
+            dates = chunk["invoice_date"].dropna()
+            if dates.empty:
+                txns = pd.DataFrame(columns=["id", "date", "amount", "description", "invoice_key"])
+            else:
+                start = dates.min().to_pydatetime() - window
+                end = dates.max().to_pydatetime() + window
+                txns = _load_candidate_transactions(db, filing, start, end)
+            matched = match_chunk(chunk, txns, keyed)
+            _persist_lines(db, filing, matched)
+            filing.line_count += len(chunk)
+            db.commit()
+            keyed = keyed[~keyed["id"].isin(matched["matched_transaction_id"].dropna())]
+    except Exception:
+        db.rollback()
+        filing.status = "Failed"
+        db.commit()
+        raise
+
+    _supersede_previous(db, filing)
+    filing.status = "Reconciled"
+    filing.reconciled_at = datetime.utcnow()
+    db.commit()
+    return summarize(db, business_id, filing_id=filing.id)
+
+
+def _counted_filings(db: Session, business_id: int):
+    """
+    Ids of the filings the business summary is built from: only reconciled
+    ones, and not a GSTR-2A for any period that also has a GSTR-2B, so each
+    period has a single inward (ITC) view.
+    """
+    active = db.query(GstFiling).filter(
+        GstFiling.business_id == business_id,
+        GstFiling.status == "Reconciled",
+    )
+    conditions = []
+    for return_type, replacement in SUPERSEDED_BY.items():
+        newer = aliased(GstFiling)
+        replaced_periods = db.query(newer.period).filter(
+            newer.business_id == business_id,
+            newer.return_type == replacement,
+            newer.status == "Reconciled",
+            newer.period.isnot(None),
+        )
+        conditions.append(or_(
+            GstFiling.return_type != return_type,
+            GstFiling.period.is_(None),
+            GstFiling.period.notin_(replaced_periods),
+        ))
+    return active.filter(*conditions).with_entities(GstFiling.id)
+
+
+def summarize(db: Session, business_id: int, filing_id: Optional[int] = None, max_flags: int = 20) -> Dict:
+    """
+    Aggregates reconciliation results in SQL; only the flagged sample is fetched row by row.
+    Without a filing_id the summary covers the filings from _counted_filings.
+    """
+    base = db.query(GstReturnLine).filter(GstReturnLine.business_id == business_id)
+    if filing_id is not None:
+        base = base.filter(GstReturnLine.filing_id == filing_id)
+    else:
+        base = base.filter(GstReturnLine.filing_id.in_(_counted_filings(db, business_id)))
+
+    counts = dict(
+        base.with_entities(GstReturnLine.match_status, func.count(GstReturnLine.id))
+        .group_by(GstReturnLine.match_status).all()
+    )
+    total = sum(counts.values())
+
+    inward_filings = db.query(GstFiling.id).filter(
+        GstFiling.business_id == business_id,
+        GstFiling.return_type.in_([t for t, kind in RETURN_TYPES.items() if kind == "Expense"]),
+    )
+    itc_at_risk = base.filter(
+        GstReturnLine.match_status.in_(AT_RISK_STATUSES),
+        GstReturnLine.filing_id.in_(inward_filings),
+    ).with_entities(func.coalesce(func.sum(GstReturnLine.tax_amount), 0.0)).scalar()
+
+    flagged = base.filter(GstReturnLine.match_status.in_(AT_RISK_STATUSES)).order_by(
+        GstReturnLine.tax_amount.desc()
+    ).limit(max_flags).all()
+
+    mismatches = sum(counts.get(s, 0) for s in AT_RISK_STATUSES)
+    mismatch_rate = mismatches / total if total else 0.0
+    if not total:
+        risk = "Unknown"
+    elif mismatch_rate < 0.02 and itc_at_risk < 10000:
+        risk = "Low"
+    elif mismatch_rate < 0.10:
+        risk = "Medium"
+    else:
+        risk = "High"
+
+    return {
+        "risk_level": risk,
+        "lines_reconciled": total,
+        "status_counts": counts,
+        "mismatch_rate": round(mismatch_rate, 4),
+        "unparseable_lines": counts.get(INVALID_DATE, 0),
+        "itc_at_risk": round(float(itc_at_risk or 0), 2),
+        "flags": [
+            {
+                "invoice_number": line.invoice_number,
+                "counterparty_gstin": line.counterparty_gstin,
+                "invoice_date": line.invoice_date,
+                "invoice_value": line.invoice_value,
+                "tax_amount": line.tax_amount,
+                "issue": line.match_status,
+            }
+            for line in flagged
+        ],
+    }
+
+
+def compliance_overview(db: Session, business_id: int, gst_number: Optional[str]) -> Dict:
+    last = db.query(GstFiling).filter(
+        GstFiling.business_id == business_id, GstFiling.status == "Reconciled"
+    ).order_by(GstFiling.reconciled_at.desc()).first()
+
+    summary = summarize(db, business_id)
+    if not last:
+        details = "No GST returns uploaded yet. Upload GSTR-1/GSTR-2B data to reconcile against your books."
+    elif summary["flags"]:
+        details = f"{sum(summary['status_counts'].get(s, 0) for s in AT_RISK_STATUSES)} return lines need attention."
+    else:
+        details = "All return lines match your books."
+
+    summary.update({
+        "gst_number": gst_number,
+        "gst_status": "Filed" if last else "Not Filed",
+        "last_filing_date": last.reconciled_at.date().isoformat() if last else None,
+        "details": details,
+    })
+    return summary
@@ -0,0 +1,120 @@
+import math
+import random
+import struct
+from typing import List, Optional
+
+import numpy as np
+
+HEADER = struct.Struct("<IQH")
+LEVEL = struct.Struct("<I")
+
+
+class KLLSketch:
+    """
+    Mergeable KLL quantile sketch (Karnin, Lang, Liberty 2016).
+    Memory is O(k) regardless of how many values were inserted, and two
+    sketches of the same k can be merged without losing accuracy guarantees.
+    """
+
+    def __init__(self, k: int = 200, c: float = 2 / 3):
+        self.k = k
+        self.c = c
+        self.n = 0
+        self.compactors: List[List[float]] = [[]]
+        self._cdf = None
+
+    @property
+    def height(self) -> int:
+        return len(self.compactors)
+
+    def _capacity(self, level: int) -> int:
+        depth = self.height - level - 1
+        return max(2, int(math.ceil(self.k * self.c ** depth)))
+
+    def _max_size(self) -> int:
+        return sum(self._capacity(h) for h in range(self.height))
+
+    def _size(self) -> int:
+        return sum(len(c) for c in self.compactors)
+
+    def _compress(self):
+        while self._size() >= self._max_size():
+            for h in range(self.height):
+                compactor = self.compactors[h]
+                if len(compactor) >= self._capacity(h):
+                    if h + 1 >= self.height:
+                        self.compactors.append([])
+                    compactor.sort()
+                    # Keep one item behind when the level has an odd length
+                    leftover = [compactor.pop()] if len(compactor) % 2 else []
+                    offset = random.randint(0, 1)
+                    self.compactors[h + 1].extend(compactor[offset::2])
+                    self.compactors[h] = leftover
+                    break
+
+    def update(self, value: float):
+        if value is None or not math.isfinite(value):
+            return
+        self.compactors[0].append(float(value))
+        self.n += 1
+        self._cdf = None
+        if len(self.compactors[0]) >= self._capacity(0):
+            self._compress()
+
+    def merge(self, other: "KLLSketch"):
+        while self.height < other.height:
+            self.compactors.append([])
+        for h, items in enumerate(other.compactors):
+            self.compactors[h].extend(items)
+        self.n += other.n
+        self._cdf = None
+        self._compress()
+
+    def _build_cdf(self):
+        values = np.concatenate([np.asarray(c, dtype=float) for c in self.compactors])
+        weights = np.concatenate([np.full(len(c), 2 ** h, dtype=float) for h, c in enumerate(self.compactors)])
+        order = np.argsort(values, kind="mergesort")
+        self._cdf = (values[order], np.cumsum(weights[order]))
+
+    def percentile_rank(self, value: float) -> Optional[float]:
+        """
+        Share of inserted values <= value, as a 0-100 percentile.
+        """
+        if self.n == 0:
+            return None
+        if self._cdf is None:
+            self._build_cdf()
+        values, cumulative = self._cdf
+        idx = int(np.searchsorted(values, value, side="right"))
+        below = cumulative[idx - 1] if idx > 0 else 0.0
+        return round(float(below / cumulative[-1]) * 100, 1)
+
+    def quantile(self, q: float) -> Optional[float]:
+        if self.n == 0:
+            return None
+        if self._cdf is None:
+            self._build_cdf()
+        values, cumulative = self._cdf
+        idx = int(np.searchsorted(cumulative, q * cumulative[-1], side="left"))
+        return float(values[min(idx, len(values) - 1)])
+
+    def to_bytes(self) -> bytes:
+        parts = [HEADER.pack(self.k, self.n, self.height)]
+        for compactor in self.compactors:
+            parts.append(LEVEL.pack(len(compactor)))
+            parts.append(np.asarray(compactor, dtype="<f8").tobytes())
+        return b"".join(parts)
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "KLLSketch":
+        k, n, height = HEADER.unpack_from(data, 0)
+        sketch = cls(k=k)
+        sketch.n = n
+        sketch.compactors = []
+        pos = HEADER.size
+        for _ in range(height):
+            (length,) = LEVEL.unpack_from(data, pos)
+            pos += LEVEL.size
+            sketch.compactors.append(np.frombuffer(data, dtype="<f8", count=length, offset=pos).tolist())
+            pos += length * 8
+        return sketch
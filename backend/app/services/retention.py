@@ -0,0 +1,386 @@
+import gzip
+import json
+import os
+import shutil
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterable, Optional, Set
+
+from sqlalchemy import column, or_, text
+from sqlalchemy.orm import Session
+
+from ..models.financial import (
+    BusinessContext, BusinessFacts, CategoryStats, GstFiling, GstReturnLine, HealthSnapshot, PeerSample,
+    Transaction, TransactionAnomaly, User,
+)
+from . import fact_index
+from .gst_reconciliation import MISSING_IN_BOOKS
+
+ARCHIVE_DIR = Path(os.getenv("ARCHIVE_DIR", "./archives"))
+
+# Rows deleted per statement, and pause between statements so writers
+# on the same table are never blocked for long
+DELETE_BATCH_SIZE = 5000
+THROTTLE_SECONDS = 0.05
+
+TRANSACTION_COLUMNS = ("id", "business_id", "date", "description", "amount", "transaction_type",
+                       "category", "source_file", "ingested_at")
+
+# Tables that hang off a business and go away with it on full erasure
+BUSINESS_SCOPED_MODELS = (GstReturnLine, GstFiling, HealthSnapshot, PeerSample, BusinessFacts, CategoryStats,
+                          TransactionAnomaly)
+
+
+def _serialize(row: Transaction) -> str:
+    record = {}
+    for col in TRANSACTION_COLUMNS:
+        value = getattr(row, col)
+        record[col] = value.isoformat() if isinstance(value, datetime) else value
+    return json.dumps(record)
+
+
+def _archive_folder(business_id: Optional[int]) -> Path:
+    return ARCHIVE_DIR / (f"business_{business_id}" if business_id is not None else "unassigned")
+
+
+class _Archive:
+    """
+    Gzip JSON Lines archive split by business, one file per business per run,
+    so an erasure can remove everything archived for a business by deleting
+    its folder. Rows without a business go to the "unassigned" folder.
+    """
+
+    def __init__(self, label: str):
+        self.label = label
+        self.stamp = datetime.utcnow().strftime("%Y%m%dT%H%M%S")
+        self.files = {}
+        self.paths = []
+
+    def write(self, rows: Iterable[Transaction]):
+        for row in rows:
+            f = self.files.get(row.business_id)
+            if f is None:
+                folder = _archive_folder(row.business_id)
+                folder.mkdir(parents=True, exist_ok=True)
+                path = folder / f"transactions_{self.label}_{self.stamp}.jsonl.gz"
+                f = self.files[row.business_id] = gzip.open(path, "wt", encoding="utf-8")
+                self.paths.append(str(path))
+            f.write(_serialize(row) + "\n")
+
+    def flush(self):
+        for f in self.files.values():
+            f.flush()
+
+    def close(self):
+        for f in self.files.values():
+            f.close()
+
+
+def _transaction_filter(query, business_id: Optional[int], start: Optional[datetime], end: Optional[datetime]):
+    if business_id is not None:
+        query = query.filter(Transaction.business_id == business_id)
+    if start is not None:
+        query = query.filter(Transaction.date >= start)
+    if end is not None:
+        query = query.filter(Transaction.date < end)
+    return query
+
+
+def _release_references(db: Session, ids):
+    """
+    Clears rows that point at transactions about to be deleted; ids is a
+    list or a SELECT of transaction ids. GST lines matched to them go back
+    to missing_in_books; anomalies on them, or flagging a duplicate of one
+    of them, are deleted.
+    """
+    db.query(GstReturnLine).filter(GstReturnLine.matched_transaction_id.in_(ids)).update(
+        {GstReturnLine.match_status: MISSING_IN_BOOKS, GstReturnLine.matched_transaction_id: None},
+        synchronize_session=False,
+    )
+    db.query(TransactionAnomaly).filter(
+        or_(TransactionAnomaly.transaction_id.in_(ids), TransactionAnomaly.duplicate_of.in_(ids))
+    ).delete(synchronize_session=False)
+
+
+def delete_transactions(
+    db: Session,
+    business_id: Optional[int] = None,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    archive: bool = True,
+    batch_size: int = DELETE_BATCH_SIZE,
+    throttle: float = THROTTLE_SECONDS,
+) -> Dict:
+    """
+    Deletes transactions in id-ordered batches, committing after each one.
+    When archive is set, each batch is appended to the gzip JSON Lines
+    archive and flushed before its rows are deleted, so nothing is removed
+    unarchived. The result lists the businesses that lost rows.
+    """
+    archive_file = _Archive(f"{start.date() if start else 'begin'}_{end.date() if end else 'now'}") if archive else None
+
+    deleted = 0
+    last_id = 0
+    businesses: Set[int] = set()
+    try:
+        while True:
+            batch = _transaction_filter(db.query(Transaction), business_id, start, end).filter(
+                Transaction.id > last_id
+            ).order_by(Transaction.id).limit(batch_size).all()
+            if not batch:
+                break
+
+            ids = [row.id for row in batch]
+            businesses.update(row.business_id for row in batch if row.business_id is not None)
+            if archive_file:
+                archive_file.write(batch)
+                archive_file.flush()
+
+            _release_references(db, ids)
+            db.query(Transaction).filter(Transaction.id.in_(ids)).delete(synchronize_session=False)
+            db.commit()
+            db.expunge_all()
+
+            deleted += len(ids)
+            last_id = ids[-1]
+            if throttle:
+                time.sleep(throttle)
+    finally:
+        if archive_file:
+            archive_file.close()
+
+    for b_id in businesses:
+        fact_index.invalidate_facts(b_id)
+    return {"deleted": deleted, "archives": archive_file.paths if archive_file else [],
+            "business_ids": sorted(businesses)}
+
+
+def erase_business(db: Session, business_id: int, archive: bool = False, **kwargs) -> Dict:
+    """
+    Removes every row belonging to a business (e.g. a GDPR erasure request),
+    including archives written by earlier purges. Nothing is archived unless
+    asked for, since the archive is plain gzip; with archive set, the
+    business's archive folder is kept and reported.
+    User accounts are left alone; they are unlinked from the business.
+    Industry peer sketches cannot forget single values and are not touched.
+    """
+    if partitioning_scheme(db) == "business":
+        result = drop_business_partition(db, business_id, archive=archive)
+    else:
+        result = delete_transactions(db, business_id, archive=archive, **kwargs)
+
+    for model in BUSINESS_SCOPED_MODELS:
+        db.query(model).filter(model.business_id == business_id).delete(synchronize_session=False)
+    db.query(BusinessContext).filter(BusinessContext.id == business_id).delete(synchronize_session=False)
+    db.query(User).filter(User.business_id == business_id).update({User.business_id: None}, synchronize_session=False)
+    db.commit()
+
+    fact_index.invalidate_facts(business_id)
+
+    folder = _archive_folder(business_id)
+    if archive:
+        result["archive_folder"] = str(folder) if folder.exists() else None
+    else:
+        result["archives_removed"] = folder.exists()
+        shutil.rmtree(folder, ignore_errors=True)
+    return result
+
+
+def purge_business_range(db: Session, business_id: int, start: Optional[datetime], end: Optional[datetime],
+                         archive: bool = True, **kwargs) -> Dict:
+    """
+    Deletes part of one business's history and refreshes its fact index.
+    """
+    result = delete_transactions(db, business_id, start, end, archive=archive, **kwargs)
+    fact_index.rebuild_facts(db, business_id)
+    return result
+
+
+def purge_before(db: Session, cutoff: datetime, archive: bool = True, **kwargs) -> Dict:
+    """
+    Retention sweep across all businesses. With monthly partitions, whole
+    months older than the cutoff are dropped; the rest is deleted in batches.
+    Every business that lost rows gets its fact index rebuilt.
+    """
+    dropped = []
+    if partitioning_scheme(db) == "month":
+        dropped = drop_month_partitions_before(db, cutoff, archive=archive)
+    result = delete_transactions(db, None, None, cutoff, archive=archive, **kwargs)
+    result["dropped_partitions"] = dropped
+
+    affected = set(result["business_ids"]).union(*(d["business_ids"] for d in dropped))
+    for business_id in sorted(affected):
+        fact_index.rebuild_facts(db, business_id)
+    result["business_ids"] = sorted(affected)
+    return result
+
+
+# --- Postgres partitioning -------------------------------------------------
+
+def partitioning_scheme(db: Session) -> Optional[str]:
+    """
+    Returns "month", "business" or None for the live transactions table.
+    """
+    if db.bind.dialect.name != "postgresql":
+        return None
+    keydef = db.execute(text(
+        "SELECT pg_get_partkeydef(c.oid) FROM pg_class c "
+        "JOIN pg_namespace n ON n.oid = c.relnamespace "
+        "WHERE c.relname = 'transactions' AND n.nspname = current_schema()"
+    )).scalar()
+    if not keydef:
+        return None
+    return "business" if "business_id" in keydef else "month"
+
+
+def _partition_name(scheme: str, key) -> str:
+    if scheme == "business":
+        return f"transactions_b{int(key)}"
+    return f"transactions_{key:%Y_%m}"
+
+
+def _month_bounds(month: datetime):
+    start = month.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    end = start.replace(year=start.year + 1, month=1) if start.month == 12 else start.replace(month=start.month + 1)
+    return start, end
+
+
+def ensure_partition(conn, scheme: str, key):
+    """
+    Creates the partition for a business id or for the month containing key.
+    """
+    name = _partition_name(scheme, key)
+    if scheme == "business":
+        bounds = f"FOR VALUES IN ({int(key)})"
+    else:
+        start, end = _month_bounds(key)
+        bounds = f"FOR VALUES FROM ('{start:%Y-%m-%d}') TO ('{end:%Y-%m-%d}')"
+    conn.execute(text(f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF transactions {bounds}"))
+
+
+def _upcoming_months(months_ahead: int):
+    month, _ = _month_bounds(datetime.utcnow())
+    for _ in range(months_ahead + 1):
+        yield month
+        _, month = _month_bounds(month)
+
+
+def ensure_month_partitions(db: Session, months_ahead: int = 3) -> Dict:
+    """
+    Pre-creates monthly partitions so new rows never land in the default one.
+    Meant to run from cron when transactions are partitioned by month.
+    """
+    if partitioning_scheme(db) != "month":
+        return {"partitions": []}
+    names = []
+    for month in _upcoming_months(months_ahead):
+        ensure_partition(db.connection(), "month", month)
+        names.append(_partition_name("month", month))
+    db.commit()
+    return {"partitions": names}
+
+
+def partition_transactions(engine, scheme: str = "month"):
+    """
+    One-off Postgres migration: rebuilds transactions as a table partitioned
+    by month (RANGE on date) or by business (LIST on business_id), so that a
+    retention purge becomes a partition drop. Rows outside the created
+    partitions land in transactions_default; rows whose key is NULL are moved
+    to transactions_unkeyed, and the key is NOT NULL from then on.
+    """
+    if scheme not in ("month", "business"):
+        raise ValueError(f"Unknown partitioning scheme: {scheme}")
+    if engine.dialect.name != "postgresql":
+        raise ValueError("Table partitioning is only available on PostgreSQL")
+
+    key = "business_id" if scheme == "business" else "date"
+    method = "LIST" if scheme == "business" else "RANGE"
+    with engine.begin() as conn:
+        conn.execute(text("ALTER TABLE transactions RENAME TO transactions_unpartitioned"))
+        conn.execute(text(
+            f"CREATE TABLE transactions (LIKE transactions_unpartitioned INCLUDING DEFAULTS) "
+            f"PARTITION BY {method} ({key})"
+        ))
+        # Partitioned primary keys must include the partition column
+        conn.execute(text(f"ALTER TABLE transactions ADD PRIMARY KEY (id, {key})"))
+        conn.execute(text("CREATE TABLE transactions_default PARTITION OF transactions DEFAULT"))
+
+        if scheme == "business":
+            keys = conn.execute(text(
+                "SELECT DISTINCT business_id FROM transactions_unpartitioned WHERE business_id IS NOT NULL"
+            )).scalars().all()
+        else:
+            keys = conn.execute(text(
+                "SELECT DISTINCT date_trunc('month', date) FROM transactions_unpartitioned WHERE date IS NOT NULL"
+            )).scalars().all()
+        if scheme == "month":
+            keys = set(keys) | set(_upcoming_months(3))
+        for k in keys:
+            ensure_partition(conn, scheme, k)
+
+        # The partition key is part of the primary key, so it can't be NULL;
+        # such rows are moved to transactions_unkeyed rather than lost
+        unkeyed = conn.execute(text(f"SELECT count(*) FROM transactions_unpartitioned WHERE {key} IS NULL")).scalar()
+        if unkeyed:
+            conn.execute(text(
+                f"CREATE TABLE transactions_unkeyed AS SELECT * FROM transactions_unpartitioned WHERE {key} IS NULL"
+            ))
+        conn.execute(text(f"INSERT INTO transactions SELECT * FROM transactions_unpartitioned WHERE {key} IS NOT NULL"))
+        conn.execute(text("ALTER SEQUENCE transactions_id_seq OWNED BY transactions.id"))
+        conn.execute(text("DROP TABLE transactions_unpartitioned"))
+
+        # The old indexes went with the old table; recreate every one the model declares
+        for index in Transaction.__table__.indexes:
+            index.create(conn)
+    return {"unkeyed_rows": unkeyed}
+
+
+def _archive_and_drop(db: Session, partition: str, label: str, archive: bool) -> Dict:
+    archive_file = None
+    if archive:
+        archive_file = _Archive(label)
+        rows = db.query(Transaction).from_statement(text(f"SELECT * FROM {partition}")).execution_options(yield_per=DELETE_BATCH_SIZE)
+        try:
+            archive_file.write(rows)
+        finally:
+            archive_file.close()
+        db.expunge_all()
+    count = db.execute(text(f"SELECT count(*) FROM {partition}")).scalar()
+    businesses = db.execute(text(
+        f"SELECT DISTINCT business_id FROM {partition} WHERE business_id IS NOT NULL"
+    )).scalars().all()
+    _release_references(db, text(f"SELECT id FROM {partition}").columns(column("id")))
+    db.execute(text(f"ALTER TABLE transactions DETACH PARTITION {partition}"))
+    db.execute(text(f"DROP TABLE {partition}"))
+    db.commit()
+    for business_id in businesses:
+        fact_index.invalidate_facts(business_id)
+    return {"deleted": count, "archives": archive_file.paths if archive_file else [], "partition": partition,
+            "business_ids": sorted(businesses)}
+
+
+def drop_business_partition(db: Session, business_id: int, archive: bool = True) -> Dict:
+    partition = _partition_name("business", business_id)
+    exists = db.execute(text("SELECT to_regclass(:p)"), {"p": partition}).scalar()
+    if not exists:
+        # Rows may still sit in the default partition
+        return delete_transactions(db, business_id, archive=archive)
+    return _archive_and_drop(db, partition, "all", archive)
+
+
+def drop_month_partitions_before(db: Session, cutoff: datetime, archive: bool = True):
+    partitions = db.execute(text(
+        "SELECT c.relname FROM pg_inherits i "
+        "JOIN pg_class c ON c.oid = i.inhrelid "
+        "JOIN pg_class p ON p.oid = i.inhparent "
+        "WHERE p.relname = 'transactions' AND c.relname ~ '^transactions_[0-9]{4}_[0-9]{2}$'"
+    )).scalars().all()
+
+    dropped = []
+    for name in sorted(partitions):
+        month = datetime.strptime(name[len("transactions_"):], "%Y_%m")
+        _, end = _month_bounds(month)
+        if end <= cutoff:
+            dropped.append(_archive_and_drop(db, name, f"{month:%Y_%m}", archive))
+    return dropped
@@ -0,0 +1,67 @@
+from datetime import datetime
+from typing import Dict, Iterator, Optional
+
+from sqlalchemy import tuple_
+from sqlalchemy.orm import Session
+
+from ..models.financial import Transaction
+from ..core.encoding import dumps
+from .pagination import STREAM_BATCH_SIZE, clamp_limit, decode_cursor, encode_cursor
+
+COLUMNS = (
+    Transaction.id,
+    Transaction.date,
+    Transaction.description,
+    Transaction.amount,
+    Transaction.transaction_type,
+    Transaction.category,
+    Transaction.source_file,
+)
+
+
+def _filtered(db: Session, business_id: int, transaction_type: Optional[str], category: Optional[str],
+              start: Optional[datetime], end: Optional[datetime], cursor: Optional[str]):
+    # Only plain columns are selected, so no ORM objects pile up in the session
+    query = db.query(*COLUMNS).filter(Transaction.business_id == business_id)
+    if transaction_type:
+        query = query.filter(Transaction.transaction_type == transaction_type)
+    if category:
+        query = query.filter(Transaction.category == category)
+    if start:
+        query = query.filter(Transaction.date >= start)
+    if end:
+        query = query.filter(Transaction.date < end)
+    if cursor:
+        last_date, last_id = decode_cursor(cursor, 2)
+        try:
+            last_date, last_id = datetime.fromisoformat(last_date), int(last_id)
+        except (TypeError, ValueError):
+            raise ValueError("Malformed cursor")
+        query = query.filter(tuple_(Transaction.date, Transaction.id) > (last_date, last_id))
+    return query.order_by(Transaction.date, Transaction.id)
+
+
+def list_transactions(db: Session, business_id: int, limit: int, cursor: Optional[str] = None,
+                      transaction_type: Optional[str] = None, category: Optional[str] = None,
+                      start: Optional[datetime] = None, end: Optional[datetime] = None) -> Dict:
+    """
+    One keyset page ordered by (date, id). Fetches limit + 1 rows to know
+    whether another page exists without a COUNT.
+    """
+    limit = clamp_limit(limit)
+    rows = _filtered(db, business_id, transaction_type, category, start, end, cursor).limit(limit + 1).all()
+    items = [row._asdict() for row in rows[:limit]]
+    next_cursor = encode_cursor([items[-1]["date"], items[-1]["id"]]) if len(rows) > limit else None
+    return {"items": items, "next_cursor": next_cursor}
+
+
+def stream_transactions(db: Session, business_id: int, cursor: Optional[str] = None,
+                        transaction_type: Optional[str] = None, category: Optional[str] = None,
+                        start: Optional[datetime] = None, end: Optional[datetime] = None) -> Iterator[bytes]:
+    """
+    NDJSON export. Uses a server-side cursor (yield_per) so memory stays flat
+    regardless of how many rows match.
+    """
+    # Built eagerly so a bad cursor fails before the response starts
+    query = _filtered(db, business_id, transaction_type, category, start, end, cursor)
+    return (dumps(row._asdict()) + b"\n" for row in query.yield_per(STREAM_BATCH_SIZE))
@@ -1,20 +1,86 @@
-from app.core.database import engine, Base
+import argparse
+from datetime import datetime
+from app.core.database import engine, Base, SessionLocal
+from app.models import financial  # registers every table on Base.metadata
+from app.services import retention
 from sqlalchemy import text
 
 def wipe_db():
     print("WARNING: Wiping all data from financial_platform.db...")
     
-    # Drop all tables via SQL to be absolutely sure
+    # Drop every mapped table, plus legacy tables that are no longer mapped
+    Base.metadata.drop_all(bind=engine)
     with engine.connect() as conn:
-        conn.execute(text("DROP TABLE IF EXISTS transactions"))
         conn.execute(text("DROP TABLE IF EXISTS businesses"))
-        conn.execute(text("DROP TABLE IF EXISTS transaction"))
-        conn.execute(text("DROP TABLE IF EXISTS business_context"))
+        conn.execute(text("DROP TABLE IF EXISTS \"transaction\""))
         conn.commit()
     
     # Re-create tables
     Base.metadata.create_all(bind=engine)
     print("Database wiped and tables re-created successfully.")
 
+def _date(value):
+    return datetime.fromisoformat(value) if value else None
+
+def main():
+    parser = argparse.ArgumentParser(description="Data retention, deletion and archival")
+    parser.add_argument("--no-archive", action="store_true", help="Purge without writing a compressed archive")
+    parser.add_argument("--batch-size", type=int, default=retention.DELETE_BATCH_SIZE)
+    parser.add_argument("--throttle", type=float, default=retention.THROTTLE_SECONDS, help="Seconds to pause between batches")
+    sub = parser.add_subparsers(dest="command")
+
+    erase = sub.add_parser("erase-business", help="Remove every row belonging to one business, including its earlier archives")
+    erase.add_argument("business_id", type=int)
+    erase.add_argument(
+        "--archive", action="store_true",
+        help="Also keep an unencrypted gzip copy of the erased transactions; "
+             "do not use this to fulfil an erasure (e.g. GDPR) request",
+    )
+
+    purge = sub.add_parser("purge-business", help="Delete one business's transactions in a date range")
+    purge.add_argument("business_id", type=int)
+    purge.add_argument("--start", help="Inclusive ISO date")
+    purge.add_argument("--end", help="Exclusive ISO date")
+
+    before = sub.add_parser("purge-before", help="Retention sweep: delete all transactions older than a date")
+    before.add_argument("cutoff", help="Exclusive ISO date")
+
+    part = sub.add_parser("partition", help="PostgreSQL only: partition transactions by month or business")
+    part.add_argument("--by", choices=["month", "business"], default="month")
+
+    months = sub.add_parser("ensure-partitions", help="PostgreSQL only: pre-create upcoming monthly partitions")
+    months.add_argument("--months-ahead", type=int, default=3)
+
+    sub.add_parser("wipe", help="Drop and re-create all tables (development only)")
+
+    args = parser.parse_args()
+    batch = {"batch_size": args.batch_size, "throttle": args.throttle}
+    archive = not args.no_archive
+
+    if args.command == "wipe":
+        wipe_db()
+        return
+    if args.command == "partition":
+        result = retention.partition_transactions(engine, args.by)
+        print(f"Transactions partitioned by {args.by}. {result['unkeyed_rows']} rows without a key moved to transactions_unkeyed.")
+        return
+
+    db = SessionLocal()
+    try:
+        if args.command == "erase-business":
+            result = retention.erase_business(db, args.business_id, archive=args.archive, **batch)
+        elif args.command == "purge-business":
+            result = retention.purge_business_range(db, args.business_id, _date(args.start), _date(args.end), archive=archive, **batch)
+        elif args.command == "purge-before":
+            result = retention.purge_before(db, _date(args.cutoff), archive=archive, **batch)
+        elif args.command == "ensure-partitions":
+            result = retention.ensure_month_partitions(db, args.months_ahead)
+        else:
+            parser.print_help()
+            return
+        print(result)
+    finally:
+        db.close()
+
 if __name__ == "__main__":
-    wipe_db()
+    main()
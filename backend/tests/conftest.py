@@ -0,0 +1,26 @@
+import sys
+from pathlib import Path
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+# Tests import the app package the same way main.py does
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.core.database import Base  # noqa: E402
+from app.models import financial  # noqa: E402,F401  registers every table on Base.metadata
+
+
+@pytest.fixture
+def db():
+    # Fresh in-memory SQLite database per test
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    session = sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+    try:
+        yield session
+    finally:
+        session.close()
+        engine.dispose()
@@ -0,0 +1,78 @@
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.models.financial import CategoryStats, Transaction, TransactionAnomaly
+from app.services import anomaly
+
+
+def _ingest(db, rows):
+    """Saves rows the way the upload endpoint does and runs the anomaly stage."""
+    txns = [Transaction(business_id=1, **row) for row in rows]
+    db.add_all(txns)
+    db.flush()
+    result = anomaly.detect_anomalies(db, 1, [{**row, "id": t.id} for row, t in zip(rows, txns)])
+    db.commit()
+    return result
+
+
+def _row(day, amount, description="Office supplies", category="Supplies", t_type="Expense"):
+    return {"date": datetime(2024, 1, 1) + timedelta(days=day), "amount": amount, "description": description,
+            "category": category, "transaction_type": t_type}
+
+
+def test_batched_welford_merge_matches_numpy(db):
+    values = np.random.default_rng(5).gamma(shape=2.0, scale=500.0, size=300).round(2)
+    # Uneven batch sizes exercise the parallel (Chan) merge, including a batch of one
+    for chunk in np.split(values, [1, 40, 41, 180]):
+        batch = pd.DataFrame({
+            "id": range(len(chunk)), "date": pd.Timestamp("2024-01-01"), "amount": chunk,
+            "category": "Supplies", "transaction_type": "Expense",
+        })
+        stats = anomaly._load_stats(db, 1, ["Supplies"])
+        anomaly._update_stats(db, 1, batch, stats)
+        db.commit()
+
+    row = db.query(CategoryStats).one()
+    assert row.count == len(values)
+    assert row.mean == pytest.approx(values.mean(), rel=1e-12)
+    assert row.m2 / (row.count - 1) == pytest.approx(values.var(ddof=1), rel=1e-9)
+
+
+def test_outlier_needs_history_and_a_large_deviation(db):
+    history = [_row(i, 1000 + (i % 5) * 10) for i in range(anomaly.MIN_HISTORY + 5)]
+    assert _ingest(db, history) == {"outliers": 0, "duplicates": 0}
+
+    result = _ingest(db, [_row(30, 1015, "Stationery"), _row(31, 25000, "Printer")])
+    assert result == {"outliers": 1, "duplicates": 0}
+    flagged = db.query(TransactionAnomaly).one()
+    assert flagged.kind == anomaly.OUTLIER
+    assert flagged.expected_amount == pytest.approx(1020, abs=1)
+
+
+def test_duplicates_within_a_batch(db):
+    result = _ingest(db, [
+        _row(0, 499.0, "AWS  Invoice #1"),
+        _row(1, 499.0, "aws invoice 1"),         # same charge a day later
+        _row(5, 499.0, "AWS invoice 1"),         # outside the window
+        _row(1, 499.0, "AWS invoice 1", t_type="Income"),
+    ])
+    assert result["duplicates"] == 1
+    dup = db.query(TransactionAnomaly).one()
+    original = db.query(Transaction).filter(Transaction.id == dup.duplicate_of).one()
+    assert (original.date, dup.transaction_id) == (datetime(2024, 1, 1), original.id + 1)
+
+
+def test_duplicates_against_history(db):
+    _ingest(db, [_row(0, 120.0, "Broadband bill"), _row(10, 120.0, "Broadband bill")])
+
+    result = _ingest(db, [_row(11, 120.0, "BROADBAND BILL"), _row(20, 120.0, "Broadband bill")])
+
+    assert result["duplicates"] == 1
+    dup = db.query(TransactionAnomaly).one()
+    original = db.query(Transaction).filter(Transaction.id == dup.duplicate_of).one()
+    assert original.date == datetime(2024, 1, 11)
+    # Duplicates are kept out of the running statistics
+    assert db.query(CategoryStats).one().count == 3
@@ -0,0 +1,60 @@
+from datetime import datetime
+
+import pytest
+
+from app.models.financial import HealthSnapshot, IndustrySketch, PeerSample
+from app.services import benchmarks
+
+
+@pytest.fixture(autouse=True)
+def clear_sketch_cache():
+    benchmarks._sketch_cache.clear()
+
+
+def _analysis(current_ratio, net_margin=0.2, income=100000.0):
+    return {
+        "overall_score": 70,
+        "metrics": {"current_ratio": current_ratio, "net_margin": net_margin, "total_income": income, "status": "Healthy"},
+    }
+
+
+def test_latest_snapshot_of_a_month_is_the_sample(db):
+    benchmarks.record_snapshot(db, 1, "Retail", _analysis(1.0, income=1000.0))
+    benchmarks.record_snapshot(db, 1, "Retail", _analysis(2.5, income=50000.0))
+
+    assert db.query(HealthSnapshot).count() == 2
+    (sample,) = db.query(PeerSample).all()
+    assert (sample.current_ratio, sample.scale, sample.sketched) == (2.5, 50000.0, False)
+    # The month is still open, so nothing reaches the sketches yet
+    assert db.query(IndustrySketch).count() == 0
+
+
+def test_closed_months_are_folded_once(db):
+    for business_id, ratio in ((1, 1.0), (2, 2.0), (3, 3.0)):
+        benchmarks.record_snapshot(db, business_id, "Retail", _analysis(ratio))
+
+    later = datetime(2100, 1, 1)
+    assert benchmarks.fold_closed_samples(db, later) == 3
+    db.commit()
+    assert benchmarks.fold_closed_samples(db, later) == 0
+
+    sketch = benchmarks.get_sketch(db, "Retail", "current_ratio")
+    assert sketch.n == 3
+    assert sketch.quantile(0.5) == 2.0
+    assert benchmarks.get_peer_percentiles(db, "Retail", {"current_ratio": 3.0})["sample_count"] == 3
+
+
+def test_sketch_rows_are_upserted(db):
+    # A row another worker created in the meantime must not fail the insert
+    benchmarks.record_snapshot(db, 1, "Retail", _analysis(1.5))
+    benchmarks.fold_closed_samples(db, datetime(2100, 1, 1))
+    db.commit()
+    benchmarks._upsert(db, IndustrySketch, {"industry": "Retail", "metric": "scale", "sketch": b"", "count": 0},
+                       keys=("industry", "metric"))
+    db.commit()
+    assert db.query(IndustrySketch).filter(IndustrySketch.metric == "scale").one().count == 1
+
+
+def test_no_data_is_not_recorded(db):
+    assert benchmarks.record_snapshot(db, 1, "Retail", {"overall_score": 0, "metrics": {"status": "No Data"}}) is None
+    assert db.query(PeerSample).count() == 0
@@ -0,0 +1,23 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from app.services import chat
+
+
+def test_credit_score_is_a_score_question():
+    assert chat.detect_intent("What's my credit score?") == "score"
+    assert chat.detect_intent("Can I get credit for new machinery?") == "loan"
+    assert chat.detect_intent("How does my profit affect my score?") == "profit"
+
+
+def test_response_cache_is_safe_under_concurrent_eviction(monkeypatch):
+    monkeypatch.setattr(chat, "RESPONSE_CACHE_SIZE", 4)
+    chat._response_cache.clear()
+
+    def ask(i):
+        return chat.answer(f"question {i % 11} about profit", 1, None)
+
+    with ThreadPoolExecutor(max_workers=16) as pool:
+        answers = list(pool.map(ask, range(5000)))
+
+    assert set(answers) == {chat.NO_DATA_MESSAGE}
+    assert len(chat._response_cache) <= 4
@@ -0,0 +1,157 @@
+import io
+import json
+
+import pandas as pd
+import pytest
+from fastapi import HTTPException
+
+from app.models.financial import GstFiling, Transaction
+from app.services import gst_reconciliation as gst
+
+
+def _lines(rows):
+    return gst._normalize_lines(pd.DataFrame(rows))
+
+
+def _txns(rows):
+    txns = pd.DataFrame(rows, columns=["id", "date", "amount", "description"])
+    txns["date"] = pd.to_datetime(txns["date"])
+    txns["amount"] = txns["amount"].astype(float)
+    refs = txns["description"].astype(str).str.extract(gst.INVOICE_PATTERN, expand=False)
+    txns["invoice_key"] = gst.normalize_invoice_keys(refs).where(refs.notna(), None)
+    return txns
+
+
+def test_parse_invoice_dates_reads_iso_and_portal_formats_per_value():
+    dates = gst.parse_invoice_dates(pd.Series(["2025-01-05", "05-01-2025", "2025-01-05T10:30:00", "07/01/2025"]))
+    assert dates.dt.strftime("%Y-%m-%d").tolist() == ["2025-01-05", "2025-01-05", "2025-01-05", "2025-01-07"]
+
+
+def test_parse_invoice_dates_is_not_driven_by_the_first_row():
+    # A portal-style first row must not make later ISO rows parse day-first
+    dates = gst.parse_invoice_dates(pd.Series(["13-01-2025", "2025-02-03"]))
+    assert dates.dt.strftime("%Y-%m-%d").tolist() == ["2025-01-13", "2025-02-03"]
+
+
+def test_unparseable_dates_are_kept_and_flagged():
+    lines = _lines([
+        {"inum": "INV-1", "dt": "2025-01-05", "val": "100"},
+        {"inum": "INV-2", "dt": "not a date", "val": "200"},
+        {"inum": "INV-3", "dt": "", "val": "300"},
+    ])
+    assert len(lines) == 3
+    assert lines["invoice_date"].isna().sum() == 2
+
+    matched = gst.match_chunk(lines, _txns([(1, "2025-01-05", 200, "Payment INV-2")]))
+    assert matched["match_status"].tolist() == [gst.MISSING_IN_BOOKS, gst.INVALID_DATE, gst.INVALID_DATE]
+    assert matched["matched_transaction_id"].isna().all()
+
+
+def test_iter_return_chunks_flattens_portal_json():
+    doc = {"data": {"b2b": [{"ctin": "29ABCDE1234F1Z5", "inv": [
+        {"inum": "INV/0042", "dt": "05-01-2025", "val": 1180, "itms": [{"itm_det": {"iamt": 180}}]},
+    ]}]}}
+    (chunk,) = list(gst.iter_return_chunks(io.BytesIO(json.dumps(doc).encode()), "gstr2b.json"))
+    row = chunk.iloc[0]
+    assert row["invoice_key"] == "42"
+    assert row["invoice_date"] == pd.Timestamp("2025-01-05")
+    assert row["tax_amount"] == 180
+    assert row["counterparty_gstin"] == "29ABCDE1234F1Z5"
+
+
+def test_match_chunk_statuses():
+    lines = _lines([
+        {"inum": "INV-0042", "dt": "2025-01-05", "val": "1180"},  # key, amount and date agree
+        {"inum": "INV-7", "dt": "2025-01-10", "val": "500"},      # key agrees, amount does not
+        {"inum": "INV-8", "dt": "2025-01-10", "val": "700"},      # key agrees, date too far apart
+        {"inum": "X-1", "dt": "2025-01-12", "val": "250.50"},     # no key in books, same amount nearby
+        {"inum": "X-2", "dt": "2025-01-12", "val": "999"},        # nothing in books
+    ])
+    txns = _txns([
+        (1, "2025-01-06", 1180, "NEFT supplier inv 42"),
+        (2, "2025-01-10", 450, "Invoice no. 7"),
+        (3, "2025-02-20", 700, "INV/8 payment"),
+        (4, "2025-01-14", 250.50, "Cash purchase"),
+    ])
+    matched = gst.match_chunk(lines, txns)
+    assert matched["match_status"].tolist() == [
+        gst.MATCHED, gst.AMOUNT_MISMATCH, gst.DATE_MISMATCH, gst.MATCHED_BY_AMOUNT, gst.MISSING_IN_BOOKS,
+    ]
+    assert matched["matched_transaction_id"].tolist()[:4] == [1, 2, 3, 4]
+
+
+def test_match_chunk_uses_each_transaction_once():
+    lines = _lines([
+        {"inum": "A-1", "dt": "2025-01-05", "val": "100"},
+        {"inum": "A-2", "dt": "2025-01-05", "val": "100"},
+    ])
+    matched = gst.match_chunk(lines, _txns([(1, "2025-01-05", 100, "Supplies")]))
+    assert sorted(matched["match_status"].tolist()) == [gst.MATCHED_BY_AMOUNT, gst.MISSING_IN_BOOKS]
+
+
+def test_amount_tolerance_allows_rounding():
+    lines = _lines([{"inum": "INV-5", "dt": "2025-01-05", "val": "1000.40"}])
+    matched = gst.match_chunk(lines, _txns([(1, "2025-01-05", 1000, "Inv 5")]))
+    assert matched["match_status"].tolist() == [gst.MATCHED]
+
+
+def _book(db, rows):
+    db.add_all([
+        Transaction(business_id=1, date=pd.Timestamp(date).to_pydatetime(), description=desc, amount=amount,
+                    transaction_type=t_type, category="Sales" if t_type == "Income" else "Purchases")
+        for date, desc, amount, t_type in rows
+    ])
+    db.commit()
+
+
+def _reconcile(db, csv, return_type="GSTR-1", period="2024-01", filename="return.csv"):
+    return gst.reconcile_filing(db, 1, return_type, io.BytesIO(csv.encode()), filename, period)
+
+
+def test_reconcile_flags_date_mismatch_outside_the_chunk_window(db):
+    _book(db, [("2024-01-03", "Sales INV-13", 5000, "Income")])
+    summary = _reconcile(db, "inum,dt,val\nINV-13,13-02-2024,5000\n")
+    assert summary["status_counts"] == {gst.DATE_MISMATCH: 1}
+
+
+def test_failed_reupload_keeps_the_previous_filing(db):
+    _book(db, [("2024-01-05", "Sales INV-1", 1000, "Income")])
+    _reconcile(db, "inum,dt,val\nINV-1,2024-01-05,1000\n")
+
+    with pytest.raises(HTTPException) as err:
+        _reconcile(db, "invoice,when,total\nINV-1,2024-01-05,1000\n")
+    assert err.value.status_code == 400
+
+    overview = gst.compliance_overview(db, 1, None)
+    assert overview["gst_status"] == "Filed"
+    assert overview["status_counts"] == {gst.MATCHED: 1}
+    assert db.query(GstFiling).count() == 1
+
+
+def test_reupload_replaces_the_period_and_rematches(db):
+    _book(db, [("2024-01-05", "Sales INV-1", 1000, "Income"), ("2024-01-20", "Sales INV-2", 2000, "Income")])
+    _reconcile(db, "inum,dt,val\nINV-1,2024-01-05,1000\n")
+    summary = _reconcile(db, "inum,dt,val\nINV-1,2024-01-05,1000\nINV-2,2024-01-20,2000\n")
+
+    assert summary["status_counts"] == {gst.MATCHED: 2}
+    assert gst.summarize(db, 1)["lines_reconciled"] == 2
+    assert sorted(s for (s,) in db.query(GstFiling.status).all()) == ["Reconciled", "Superseded"]
+
+
+def test_gstr2a_after_gstr2b_is_not_counted_twice(db):
+    _book(db, [("2024-01-05", "Purchase INV-9", 1180, "Expense")])
+    line = "ctin,inum,dt,val,igst\n27AAA,INV-9,2024-01-05,1180,180\n"
+    _reconcile(db, line, return_type="GSTR-2B")
+    assert _reconcile(db, line, return_type="GSTR-2A")["status_counts"] == {gst.MATCHED: 1}
+
+    summary = gst.summarize(db, 1)
+    assert summary["lines_reconciled"] == 1
+    assert summary["itc_at_risk"] == 0
+
+
+def test_large_json_documents_are_rejected(db, monkeypatch):
+    monkeypatch.setattr(gst, "MAX_JSON_BYTES", 10)
+    with pytest.raises(HTTPException) as err:
+        _reconcile(db, json.dumps([{"inum": "INV-1", "dt": "2024-01-05", "val": 1}]), filename="return.json")
+    assert err.value.status_code == 400
+    assert db.query(GstFiling).count() == 0
@@ -0,0 +1,80 @@
+import math
+import random
+
+import numpy as np
+import pytest
+
+from app.services.quantile_sketch import KLLSketch
+
+N = 100_000
+# Normalized rank error allowed for k=200; the KLL bound is roughly 1.7/k
+RANK_TOLERANCE = 0.015
+
+
+@pytest.fixture(autouse=True)
+def seeded():
+    random.seed(7)
+
+
+def _rank_error(sketch, data, q):
+    # Where the sketch's q-quantile actually falls in the sorted data
+    value = sketch.quantile(q)
+    return abs(np.searchsorted(data, value, side="right") / len(data) - q)
+
+
+def test_quantiles_stay_within_rank_error_bound():
+    data = np.random.default_rng(1).lognormal(mean=10, sigma=1.5, size=N)
+    sketch = KLLSketch()
+    for x in data:
+        sketch.update(x)
+
+    data.sort()
+    assert sketch.n == N
+    for q in (0.01, 0.1, 0.25, 0.5, 0.75, 0.9, 0.99):
+        assert _rank_error(sketch, data, q) <= RANK_TOLERANCE
+    assert abs(sketch.percentile_rank(float(np.median(data))) - 50) <= RANK_TOLERANCE * 100
+
+
+def test_memory_is_bounded_by_k():
+    sketch = KLLSketch(k=200)
+    for x in range(N):
+        sketch.update(float(x))
+    assert sketch._size() < 3 * 200 + 2 * sketch.height
+
+
+def test_merge_matches_the_union():
+    rng = np.random.default_rng(2)
+    left, right = rng.normal(0, 1, N // 2), rng.normal(3, 1, N // 2)
+    a, b = KLLSketch(), KLLSketch()
+    for x in left:
+        a.update(x)
+    for x in right:
+        b.update(x)
+
+    a.merge(b)
+    union = np.sort(np.concatenate([left, right]))
+    assert a.n == N
+    for q in (0.1, 0.5, 0.9):
+        assert _rank_error(a, union, q) <= RANK_TOLERANCE
+
+
+def test_round_trip_preserves_state():
+    sketch = KLLSketch(k=64)
+    for x in np.random.default_rng(3).uniform(0, 1000, 20_000):
+        sketch.update(x)
+
+    restored = KLLSketch.from_bytes(sketch.to_bytes())
+    assert (restored.k, restored.n, restored.height) == (sketch.k, sketch.n, sketch.height)
+    assert restored.compactors == sketch.compactors
+    assert [restored.quantile(q) for q in (0.1, 0.5, 0.9)] == [sketch.quantile(q) for q in (0.1, 0.5, 0.9)]
+    assert KLLSketch.from_bytes(KLLSketch().to_bytes()).n == 0
+
+
+def test_empty_and_non_finite_values():
+    sketch = KLLSketch()
+    assert sketch.quantile(0.5) is None
+    assert sketch.percentile_rank(1.0) is None
+    for x in (None, math.nan, math.inf, 5.0):
+        sketch.update(x)
+    assert sketch.n == 1
+    assert sketch.quantile(0.5) == 5.0
@@ -0,0 +1,84 @@
+import gzip
+import json
+from datetime import datetime
+
+import pytest
+
+from app.models.financial import BusinessContext, GstReturnLine, Transaction, TransactionAnomaly
+from app.services import fact_index, retention
+from app.services.gst_reconciliation import MATCHED, MISSING_IN_BOOKS
+
+
+@pytest.fixture(autouse=True)
+def archive_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(retention, "ARCHIVE_DIR", tmp_path)
+    fact_index._facts_cache.clear()
+    return tmp_path
+
+
+def _business(db, business_id, months):
+    db.add(BusinessContext(id=business_id, name=f"B{business_id}", industry="Retail"))
+    for month in months:
+        db.add(Transaction(business_id=business_id, date=datetime(2024, month, 10), description="Sale",
+                           amount=1000.0, transaction_type="Income", category="Sales"))
+        db.add(Transaction(business_id=business_id, date=datetime(2024, month, 12), description="Rent",
+                           amount=400.0, transaction_type="Expense", category="Rent"))
+    db.commit()
+    fact_index.rebuild_facts(db, business_id)
+
+
+def _months(db, business_id):
+    return [m["month"] for m in fact_index.get_facts(db, business_id)["monthly"]]
+
+
+def test_purge_before_rebuilds_facts_of_every_affected_business(db):
+    _business(db, 1, [7, 9])
+    _business(db, 2, [8, 10])
+
+    result = retention.purge_before(db, datetime(2024, 9, 1), archive=False, throttle=0)
+
+    assert result["deleted"] == 4
+    assert result["business_ids"] == [1, 2]
+    assert _months(db, 1) == ["2024-09"]
+    assert _months(db, 2) == ["2024-10"]
+
+
+def test_archives_are_split_by_business(db, archive_dir):
+    _business(db, 1, [7])
+    _business(db, 2, [7])
+
+    result = retention.purge_before(db, datetime(2024, 9, 1), archive=True, throttle=0)
+
+    assert len(result["archives"]) == 2
+    for business_id in (1, 2):
+        (path,) = (archive_dir / f"business_{business_id}").glob("*.jsonl.gz")
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            assert {json.loads(line)["business_id"] for line in f} == {business_id}
+
+
+def test_erasure_removes_earlier_archives(db, archive_dir):
+    _business(db, 1, [7, 9])
+    retention.purge_business_range(db, 1, None, datetime(2024, 8, 1), archive=True, throttle=0)
+    assert (archive_dir / "business_1").exists()
+
+    result = retention.erase_business(db, 1, throttle=0)
+
+    assert result["archives_removed"] is True
+    assert not (archive_dir / "business_1").exists()
+    assert db.query(Transaction).count() == 0
+    assert fact_index.get_facts(db, 1) is None
+
+
+def test_deleting_transactions_releases_gst_matches_and_anomalies(db):
+    _business(db, 1, [7, 9])
+    old, kept = db.query(Transaction.id).filter(Transaction.transaction_type == "Income").order_by(Transaction.date).all()
+    db.add(GstReturnLine(filing_id=1, business_id=1, invoice_number="INV-1", match_status=MATCHED,
+                         matched_transaction_id=old.id))
+    db.add(TransactionAnomaly(business_id=1, transaction_id=kept.id, kind="duplicate", duplicate_of=old.id))
+    db.commit()
+
+    retention.purge_business_range(db, 1, None, datetime(2024, 8, 1), archive=False, throttle=0)
+
+    line = db.query(GstReturnLine).one()
+    assert (line.match_status, line.matched_transaction_id) == (MISSING_IN_BOOKS, None)
+    assert db.query(TransactionAnomaly).count() == 0
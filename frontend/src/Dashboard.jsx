@@ -38,14 +38,14 @@ const Dashboard = ({ onLogout, businessId }) => {
 
         const fetchInitialData = async () => {
             try {
-                const res = await axios.get(`${API_URL}/comprehensive/${businessId}`);
+                const res = await axios.get(`${API_URL}/comprehensive/${businessId}?lang=${i18n.language}`);
                 setBizData(res.data);
             } catch (err) {
                 console.warn("API not reachable yet, using optimized fallback");
             }
         };
         fetchInitialData();
-    }, [businessId]);
+    }, [businessId, i18n.language]);
 
     const toggleLanguage = () => {
         const nextLang = i18n.language === 'en' ? 'hi' : 'en';
@@ -84,7 +84,7 @@ const Dashboard = ({ onLogout, businessId }) => {
 
             setUploadStatus('success');
             // Refresh data after upload
-            const res = await axios.get(`${API_URL}/comprehensive/${businessId}`);
+            const res = await axios.get(`${API_URL}/comprehensive/${businessId}?lang=${i18n.language}`);
             setBizData(res.data);
             setTimeout(() => setUploadStatus(null), 5000);
         } catch (err) {